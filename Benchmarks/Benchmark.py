@@ -0,0 +1,190 @@
+import gc
+import json
+import timeit
+
+try:
+    import tracemalloc
+except ImportError:
+    # tracemalloc is not available before Python 3.4, so the allocations are counted with the garbage collector
+    tracemalloc = None
+
+
+class Benchmark(object):
+    """This class times benchmark cases at several scales and compares the results with a baseline"""
+
+    # The minimum total time of the runs in each repeat, so fast cases are averaged over many runs
+    s_minTime = 0.05
+
+    def __init__(self, _scales=[1, 1000, 100000], _repeats=3, _gl=None):
+        """The constructor
+
+        Args:
+            _scales: The numbers of objects to run each case with
+            _repeats: The number of times to time each case, the fastest time is kept
+            _gl: A MockGL to count the GL calls made by each case, or None
+        """
+
+        self.m_scales = list(_scales)
+        self.m_repeats = _repeats
+        self.m_gl = _gl
+        # A list of (name, setup, run) tuples
+        self.m_cases = []
+        # A dictionary of case names mapped to the results at each scale
+        self.m_results = {}
+
+    def add(self, _name, _setup, _run):
+        """Add a benchmark case
+
+        Args:
+            _name: The name of the case
+            _setup: A function taking the number of objects and returning the state for _run, which is not timed
+            _run: A function taking the state, which is timed
+        """
+
+        self.m_cases.append((_name, _setup, _run))
+
+    @property
+    def results(self):
+        return self.m_results
+
+    def measure(self, _setup, _run, _scale):
+        """Time a case and count its allocations at one scale
+
+        Args:
+            _setup: The setup function of the case
+            _run: The run function of the case
+            _scale: The number of objects
+
+        Returns:
+            A dictionary of the measurements
+        """
+
+        # Time the fastest of the repeats without the garbage collector, running the case until the repeat
+        # has taken long enough to measure reliably
+        best = None
+        bestLoops = 0
+        for i in range(self.m_repeats):
+            elapsed = 0.0
+            loops = 0
+            while elapsed < Benchmark.s_minTime:
+                state = _setup(_scale)
+                gc.disable()
+                start = timeit.default_timer()
+                _run(state)
+                elapsed += timeit.default_timer() - start
+                gc.enable()
+                loops += 1
+            if best is None or elapsed / loops < best:
+                best = elapsed / loops
+                bestLoops = loops
+
+        result = {'seconds': best, 'secondsPerObject': best / _scale, 'loops': bestLoops}
+
+        # Count the GL calls of one run
+        if self.m_gl is not None:
+            state = _setup(_scale)
+            self.m_gl.reset()
+            _run(state)
+            result['glCalls'] = self.m_gl.numCalls
+
+        # Count the memory blocks allocated by one run that are still alive, and the peak memory use
+        state = _setup(_scale)
+        if tracemalloc is not None:
+            tracemalloc.start()
+            output = _run(state)
+            snapshot = tracemalloc.take_snapshot()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            del output
+            result['allocations'] = sum(stat.count for stat in snapshot.statistics('filename'))
+            result['allocationMethod'] = 'tracemalloc'
+            result['peakBytes'] = peak
+        else:
+            # Only objects tracked by the garbage collector, such as containers and class instances, are
+            # counted, and the peak memory use cannot be measured
+            gc.collect()
+            before = len(gc.get_objects())
+            output = _run(state)
+            gc.collect()
+            result['allocations'] = len(gc.get_objects()) - before
+            result['allocationMethod'] = 'gc'
+            result['peakBytes'] = None
+            del output
+
+        return result
+
+    def run(self, _filter=None):
+        """Run the cases at every scale
+
+        Args:
+            _filter: A substring of the names of the cases to run, or None to run every case
+
+        Returns:
+            A dictionary of case names mapped to a dictionary of scales mapped to the measurements
+        """
+
+        for name, setup, run in self.m_cases:
+            if _filter is not None and _filter not in name:
+                continue
+            self.m_results[name] = {}
+            for scale in self.m_scales:
+                self.m_results[name][str(scale)] = self.measure(setup, run, scale)
+
+        return self.m_results
+
+    def save(self, _fileName):
+        """Write the results to a JSON file
+
+        Args:
+            _fileName: The name of the file
+        """
+
+        with open(_fileName, 'w') as f:
+            json.dump(self.m_results, f, indent=2, sort_keys=True)
+
+    @staticmethod
+    def load(_fileName):
+        """Read results from a JSON file
+
+        Args:
+            _fileName: The name of the file
+
+        Returns:
+            The results
+        """
+
+        with open(_fileName) as f:
+            return json.load(f)
+
+    @staticmethod
+    def compare(_results, _baseline, _tolerance=0.1, _timeTolerance=0.5):
+        """Compare results with a baseline
+
+        Args:
+            _results: The new results
+            _baseline: The baseline results
+            _tolerance: The fraction the GL call and allocation counts may grow by before it is a regression
+            _timeTolerance: The fraction the time may grow by, which is larger as timings vary between runs
+
+        Returns:
+            A list of messages describing each regression
+        """
+
+        regressions = []
+        for name in sorted(_results):
+            for scale in sorted(_results[name], key=int):
+                if scale not in _baseline.get(name, {}):
+                    continue
+                new = _results[name][scale]
+                old = _baseline[name][scale]
+                for key in ['seconds', 'allocations', 'glCalls']:
+                    if new.get(key) is None or old.get(key) is None:
+                        continue
+                    # Allocations counted in different ways cannot be compared
+                    if key == 'allocations' and new.get('allocationMethod') != old.get('allocationMethod'):
+                        continue
+                    tolerance = _timeTolerance if key == 'seconds' else _tolerance
+                    if new[key] > old[key] * (1.0 + tolerance):
+                        regressions.append('%s at %s objects: %s %s -> %s' % (name, scale, key, old[key], new[key]))
+
+        return regressions
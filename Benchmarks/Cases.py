@@ -0,0 +1,98 @@
+"""The benchmark cases for the Tools math stack and the geometry generation
+
+The GL-facing modules are imported here, so a MockGL must be installed before this module is imported
+when there is no GL context.
+"""
+
+from Primitives import Primitives
+from Tools.Camera import Camera
+from Tools.MVP import MVP
+from Tools.Transformation import Transformation
+from Tools.VPMatrix import VPMatrix
+
+
+def setupTransformations(_count):
+    transformations = []
+    for i in range(_count):
+        t = Transformation()
+        t.setScale(1.0)
+        transformations.append(t)
+    return transformations
+
+
+def runTransformationMatrix(_transformations):
+    """Recompute the matrix of every transformation after changing all its components"""
+
+    for i, t in enumerate(_transformations):
+        t.setTranslation([i, 0.0, 0.0])
+        t.addRotation([0.0, 1.0, 0.0], 1.0)
+        t.setScale(2.0)
+        t.matrix
+
+
+def setupVPMatrices(_count):
+    return [VPMatrix() for i in range(_count)]
+
+
+def runVPMatrix(_vpMatrices):
+    """Recompute the view projection matrix after changing the view and projection"""
+
+    for vp in _vpMatrices:
+        vp.createViewMatrix([0.0, 0.0, 5.0], [0.0, 0.0, 0.0], [0.0, 1.0, 0.0])
+        vp.createPerspectiveMatrix(60.0, 1.5, 0.1, 100.0)
+        vp.matrix
+
+
+def setupMVPs(_count):
+    camera = Camera([0.0, 0.0, 5.0], [0.0, 0.0, 0.0])
+    camera.perspectiveProjection(60.0, 1.5, 0.1, 100.0)
+    mvps = []
+    for t in setupTransformations(_count):
+        t.setTranslation([1.0, 2.0, 3.0])
+        mvps.append(MVP(camera, t))
+    return mvps
+
+
+def runMVP(_mvps):
+    for mvp in _mvps:
+        mvp.MVP
+
+
+def runN(_mvps):
+    for mvp in _mvps:
+        mvp.N
+
+
+def setupCameras(_count):
+    return [Camera([0.0, 0.0, 5.0], [0.0, 0.0, 0.0]) for i in range(_count)]
+
+
+def runRotateVertical(_cameras):
+    for camera in _cameras:
+        camera.rotateVertical(1.0)
+
+
+def setupPrimitives(_count):
+    Primitives.s_VAOs.clear()
+    return Primitives(), _count
+
+
+def runCreateCube(_state):
+    primitives, count = _state
+    for i in range(count):
+        primitives.createCube('cube%d' % i)
+
+
+def register(_benchmark):
+    """Add every case to a benchmark
+
+    Args:
+        _benchmark: The Benchmark to add the cases to
+    """
+
+    _benchmark.add('Transformation.matrix', setupTransformations, runTransformationMatrix)
+    _benchmark.add('VPMatrix.matrix', setupVPMatrices, runVPMatrix)
+    _benchmark.add('MVP.MVP', setupMVPs, runMVP)
+    _benchmark.add('MVP.N', setupMVPs, runN)
+    _benchmark.add('Camera.rotateVertical', setupCameras, runRotateVertical)
+    _benchmark.add('Primitives.createCube', setupPrimitives, runCreateCube)
@@ -0,0 +1,89 @@
+import ctypes
+import sys
+import types
+
+
+class MockGL(object):
+    """This class stands in for the OpenGL.GL module and records the calls instead of issuing them
+
+    Installing it before the GL-facing modules are imported lets them run without a GPU or a context.
+    """
+
+    def __init__(self):
+        """The constructor"""
+
+        # VAO passes offsets as gl.ctypes.c_void_p
+        self.ctypes = ctypes
+        # The number of calls made to each function
+        self.m_calls = {}
+        # The values given to the GL_ constants
+        self.m_constants = {}
+        # The next name returned by the glGen and compile functions
+        self.m_nextName = 1
+
+    @staticmethod
+    def install():
+        """Replace the OpenGL.GL and OpenGL.GL.shaders modules with a recorder
+
+        The GL-facing modules keep the module they were first imported with, so a recorder that is already
+        installed is kept rather than replaced.
+
+        Returns:
+            The MockGL recording the calls
+        """
+
+        if isinstance(sys.modules.get('OpenGL.GL'), MockGL):
+            return sys.modules['OpenGL.GL']
+
+        mock = MockGL()
+        package = types.ModuleType('OpenGL')
+        package.GL = mock
+        mock.shaders = mock
+        sys.modules['OpenGL'] = package
+        sys.modules['OpenGL.GL'] = mock
+        sys.modules['OpenGL.GL.shaders'] = mock
+        return mock
+
+    def __getattr__(self, _name):
+        """Create the constants and functions on first use"""
+
+        if _name.startswith('__'):
+            raise AttributeError(_name)
+
+        if _name.startswith('GL_'):
+            if _name not in self.m_constants:
+                self.m_constants[_name] = len(self.m_constants) + 1
+            return self.m_constants[_name]
+
+        createsName = _name.startswith('glGen') or _name.startswith('glCreate') or _name.startswith('compile')
+        calls = self.m_calls
+
+        def record(*_args):
+            calls[_name] = calls.get(_name, 0) + 1
+            if createsName:
+                self.m_nextName += 1
+                return self.m_nextName - 1
+            return None
+
+        # Cache the function so later lookups do not go through __getattr__
+        setattr(self, _name, record)
+        return record
+
+    @property
+    def calls(self):
+        """Get the number of calls made to each function
+
+        Returns:
+            A dictionary of function names mapped to call counts
+        """
+
+        return dict(self.m_calls)
+
+    @property
+    def numCalls(self):
+        return sum(self.m_calls.values())
+
+    def reset(self):
+        """Clear the recorded calls"""
+
+        self.m_calls.clear()
@@ -0,0 +1,53 @@
+"""Run the benchmarks against a recording GL module
+
+Usage from the repository root:
+    python -m Benchmarks --output results.json --baseline baseline.json
+"""
+
+import argparse
+import sys
+from Benchmarks.MockGL import MockGL
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the Tools math stack and the geometry generation')
+    parser.add_argument('--output', default='benchmark.json', help='The JSON file to write the results to')
+    parser.add_argument('--baseline', help='A JSON file of earlier results to compare with')
+    parser.add_argument('--scales', default='1,1000,100000', help='A comma separated list of object counts')
+    parser.add_argument('--repeats', type=int, default=3, help='The number of timed runs of each case')
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help='The allowed growth of the GL call and allocation counts before a regression')
+    parser.add_argument('--time-tolerance', type=float, default=0.5,
+                        help='The allowed growth of the time before a regression')
+    parser.add_argument('--filter', help='Only run the cases whose name contains this string')
+    args = parser.parse_args()
+
+    # The GL-facing modules must see the recorder when they are imported
+    gl = MockGL.install()
+    from Benchmarks import Cases
+    from Benchmarks.Benchmark import Benchmark
+
+    benchmark = Benchmark([int(i) for i in args.scales.split(',')], args.repeats, gl)
+    Cases.register(benchmark)
+    results = benchmark.run(args.filter)
+    benchmark.save(args.output)
+
+    for name in sorted(results):
+        for scale in sorted(results[name], key=int):
+            result = results[name][scale]
+            sys.stdout.write('%-24s %8s objects %12.6f s %12.3f us/object\n' %
+                             (name, scale, result['seconds'], result['secondsPerObject'] * 1e6))
+
+    if args.baseline is not None:
+        regressions = Benchmark.compare(results, Benchmark.load(args.baseline), args.tolerance,
+                                         args.time_tolerance)
+        for regression in regressions:
+            sys.stdout.write('Regression: %s\n' % regression)
+        if regressions:
+            return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,425 @@
+import array
+import ctypes
+import struct
+import threading
+import numpy
+import OpenGL.GL as gl
+from GLBackend import GLBackend
+
+
+class CommandRecorder(object):
+    """This class records GL commands into a compact stream that can be analysed, serialised and replayed
+
+    Select a recorder with GLBackend.setCurrent to record the commands issued by VAO, ShaderStore and
+    UniformBuffer on the calling thread. Each command is stored in an array of doubles as its opcode followed
+    by its arguments. Data and strings are kept in a separate list of blobs and referenced by index.
+    Functions that create GL objects return negative placeholder names, which never clash with real names
+    or with the placeholders of other recorders. Replaying maps them to the real names in GLBackend.s_names,
+    so a frame can be recorded on a background thread and replayed on the thread that owns the context,
+    and objects created while recording resolve their real names afterwards with GLBackend.resolve.
+    """
+
+    # The recorded functions, the kind of each argument and whether the function returns a name
+    #   i: an integer or enum
+    #   n: a name returned by an earlier command
+    #   N: a list of names
+    #   b: a data blob or string
+    #   p: a pointer offset
+    #   *: any number of names
+    s_commands = [('glGenVertexArrays', 'i', True),
+                  ('glGenBuffers', 'i', True),
+                  ('glBindVertexArray', 'n', False),
+                  ('glBindBuffer', 'in', False),
+                  ('glBindBufferBase', 'iin', False),
+                  ('glBufferData', 'iibi', False),
+                  ('glBufferSubData', 'iiib', False),
+                  ('glVertexAttribPointer', 'iiiiip', False),
+                  ('glEnableVertexAttribArray', 'i', False),
+                  ('glDrawArrays', 'iii', False),
+                  ('glDrawElements', 'iiip', False),
+                  ('glUseProgram', 'n', False),
+                  ('glGetUniformBlockIndex', 'nb', True),
+                  ('glUniformBlockBinding', 'nni', False),
+                  ('glDeleteVertexArrays', 'iN', False),
+                  ('glDeleteBuffers', 'iN', False),
+                  ('compileShader', 'bi', True),
+                  ('compileProgram', '*', True)]
+    # The opcode of each recorded function
+    s_opcodes = dict((command[0], opcode) for opcode, command in enumerate(s_commands))
+    # The next placeholder name, shared by all recorders
+    s_nextName = -1
+    s_nameLock = threading.Lock()
+
+    def __init__(self):
+        """The constructor"""
+
+        # The command stream
+        self.m_words = array.array('d')
+        # The data and strings referenced by the commands
+        self.m_blobs = []
+        # The number of recorded commands
+        self.m_numCommands = 0
+        # The lowest placeholder name returned by this recorder
+        self.m_lowestName = 0
+
+    def __getattr__(self, _name):
+        """Create a recording function for each GL function in s_commands"""
+
+        if _name not in CommandRecorder.s_opcodes:
+            raise AttributeError(_name)
+
+        def record(*_args):
+            return self.record(_name, _args)
+
+        setattr(self, _name, record)
+        return record
+
+    @property
+    def numCommands(self):
+        return self.m_numCommands
+
+    @property
+    def nbytes(self):
+        """Get the size of the command stream, excluding the blobs
+
+        Returns:
+            The size in bytes
+        """
+
+        return self.m_words.itemsize * len(self.m_words)
+
+    def clear(self):
+        """Remove all the recorded commands, the placeholder names keep counting down"""
+
+        self.m_words = array.array('d')
+        self.m_blobs = []
+        self.m_numCommands = 0
+
+    @staticmethod
+    def snapshot(_data):
+        """Copy data passed to a command so later changes by the caller are not recorded
+
+        Args:
+            _data: The data, a string or None
+
+        Returns:
+            A copy of the data as a flat NumPy array, the string or None
+        """
+
+        if _data is None or isinstance(_data, (bytes, str, type(u''))):
+            return _data
+
+        return numpy.array(_data).ravel()
+
+    def record(self, _name, _args):
+        """Record a command
+
+        Args:
+            _name: The name of the GL function
+            _args: The arguments of the call
+
+        Returns:
+            A placeholder name if the function creates a GL object, otherwise None
+        """
+
+        opcode = CommandRecorder.s_opcodes[_name]
+        kinds, returnsName = CommandRecorder.s_commands[opcode][1:]
+
+        words = [opcode]
+        if kinds == '*':
+            words.append(len(_args))
+            words.extend(_args)
+        else:
+            for kind, arg in zip(kinds, _args):
+                if kind == 'b':
+                    words.append(len(self.m_blobs))
+                    self.m_blobs.append(CommandRecorder.snapshot(arg))
+                elif kind == 'p':
+                    words.append(getattr(arg, 'value', arg) or 0)
+                elif kind == 'N':
+                    words.append(len(arg))
+                    words.extend(arg)
+                else:
+                    words.append(arg)
+
+        name = None
+        if returnsName:
+            with CommandRecorder.s_nameLock:
+                name = CommandRecorder.s_nextName
+                CommandRecorder.s_nextName -= 1
+            self.m_lowestName = min(self.m_lowestName, name)
+            words.append(name)
+
+        self.m_words.extend(words)
+        self.m_numCommands += 1
+        return name
+
+    def commands(self):
+        """Decode the command stream
+
+        Yields:
+            A tuple of the function name, the list of arguments, the placeholder name it returns or None,
+            and the start and end of the command in the stream
+        """
+
+        words = self.m_words
+        i = 0
+        while i < len(words):
+            start = i
+            name, kinds, returnsName = CommandRecorder.s_commands[int(words[i])]
+            i += 1
+            if kinds == '*':
+                count = int(words[i])
+                args = [int(word) for word in words[i + 1:i + 1 + count]]
+                i += 1 + count
+            else:
+                args = []
+                for kind in kinds:
+                    if kind == 'b':
+                        args.append(self.m_blobs[int(words[i])])
+                    elif kind == 'N':
+                        count = int(words[i])
+                        args.append([int(word) for word in words[i + 1:i + 1 + count]])
+                        i += count
+                    else:
+                        args.append(int(words[i]))
+                    i += 1
+
+            result = None
+            if returnsName:
+                result = int(words[i])
+                i += 1
+
+            yield name, args, result, start, i
+
+    def replay(self, _backend=None):
+        """Issue the recorded commands
+
+        Real names are passed through unchanged, and placeholder names are mapped to the names returned
+        when the commands that created them were replayed. The mapping is kept in GLBackend.s_names, so later
+        recordings and direct commands can use the objects. A command that uses a uniform block index which
+        does not exist in the real program is skipped.
+
+        Args:
+            _backend: The backend to issue the commands to, or None for the direct GL backend
+
+        Returns:
+            A dictionary of the placeholder names created by this recording mapped to the real names
+        """
+
+        backend = _backend
+        if backend is None:
+            backend = GLBackend()
+
+        names = {}
+        for name, args, result, start, end in self.commands():
+            kinds = CommandRecorder.s_commands[CommandRecorder.s_opcodes[name]][1]
+            if kinds == '*':
+                kinds = 'n' * len(args)
+
+            values = []
+            for kind, arg in zip(kinds, args):
+                if kind == 'n':
+                    values.append(GLBackend.resolve(arg))
+                elif kind == 'N':
+                    values.append([GLBackend.resolve(item) for item in arg])
+                elif kind == 'p':
+                    values.append(ctypes.c_void_p(arg))
+                else:
+                    values.append(arg)
+
+            if name == 'glUniformBlockBinding' and values[1] == gl.GL_INVALID_INDEX:
+                continue
+
+            value = getattr(backend, name)(*values)
+            if result is not None:
+                names[result] = value
+                GLBackend.s_names[result] = value
+
+        return names
+
+    def bindingKeys(self, _name, _args):
+        """Find the binding state a command changes
+
+        Args:
+            _name: The name of the GL function
+            _args: The arguments of the call
+
+        Returns:
+            A list of (key, value) tuples for the state the command sets, where a value of None means
+            the state is unknown afterwards
+        """
+
+        if _name == 'glUseProgram':
+            return [(('program',), _args[0])]
+        elif _name == 'glBindVertexArray':
+            # The element array buffer binding belongs to the vertex array
+            return [(('vertexArray',), _args[0]), (('buffer', gl.GL_ELEMENT_ARRAY_BUFFER), None)]
+        elif _name == 'glBindBuffer':
+            return [(('buffer', _args[0]), _args[1])]
+        elif _name == 'glBindBufferBase':
+            # This also binds the buffer to the generic binding point of the target
+            return [(('buffer', _args[0]), _args[2]), (('bufferBase', _args[0], _args[1]), _args[2])]
+        else:
+            return []
+
+    def redundantCommands(self):
+        """Find the binding commands that can be removed without changing the result
+
+        A binding is dead if the same binding is replaced before any other command uses it, and a binding
+        is repeated if it sets the state that is already set once the dead bindings are removed.
+
+        Returns:
+            A sorted list of the (start, end) positions of the redundant commands in the stream
+        """
+
+        elementBuffer = ('buffer', gl.GL_ELEMENT_ARRAY_BUFFER)
+        commands = list(self.commands())
+
+        # Find the dead bindings
+        dead = set()
+        pending = {}
+        for name, args, result, start, end in commands:
+            if name not in ('glUseProgram', 'glBindVertexArray', 'glBindBuffer'):
+                pending.clear()
+                continue
+
+            # Binding an element array buffer changes the vertex array, so both bindings are used
+            if name == 'glBindVertexArray':
+                pending.pop(elementBuffer, None)
+            elif args[0] == gl.GL_ELEMENT_ARRAY_BUFFER:
+                pending.pop(('vertexArray',), None)
+
+            key = self.bindingKeys(name, args)[0][0]
+            if key in pending:
+                dead.add(pending[key])
+            pending[key] = (start, end)
+
+        # Find the repeated bindings among the remaining commands
+        redundant = set(dead)
+        state = {}
+        for name, args, result, start, end in commands:
+            if (start, end) in dead:
+                continue
+            # Deleting a bound object unbinds it
+            if name in ('glDeleteVertexArrays', 'glDeleteBuffers'):
+                state.clear()
+                continue
+            changes = self.bindingKeys(name, args)
+            if changes and all(value is None or state.get(key) == value for key, value in changes):
+                redundant.add((start, end))
+            for key, value in changes:
+                state[key] = value
+
+        return sorted(redundant)
+
+    def redundantCalls(self):
+        """Count the redundant binding commands of each function
+
+        Returns:
+            A dictionary of function names mapped to the number of redundant calls
+        """
+
+        counts = {}
+        for start, end in self.redundantCommands():
+            name = CommandRecorder.s_commands[int(self.m_words[start])][0]
+            counts[name] = counts.get(name, 0) + 1
+
+        return counts
+
+    def removeRedundant(self):
+        """Remove the redundant binding commands from the stream
+
+        Returns:
+            The number of commands removed
+        """
+
+        redundant = self.redundantCommands()
+        if not redundant:
+            return 0
+
+        words = array.array('d')
+        position = 0
+        for start, end in redundant:
+            words.extend(self.m_words[position:start])
+            position = end
+        words.extend(self.m_words[position:])
+
+        self.m_words = words
+        self.m_numCommands -= len(redundant)
+        return len(redundant)
+
+    def serialize(self):
+        """Serialise the command stream and the blobs
+
+        Returns:
+            The serialised stream as bytes
+        """
+
+        parts = [struct.pack('<4sIIIi', b'GLCS', 2, len(self.m_words), len(self.m_blobs), self.m_lowestName),
+                 numpy.asarray(self.m_words, dtype='<f8').tobytes()]
+
+        for blob in self.m_blobs:
+            if blob is None:
+                parts.append(struct.pack('<BI', 0, 0))
+            elif isinstance(blob, bytes):
+                parts.append(struct.pack('<BI', 1, len(blob)))
+                parts.append(blob)
+            elif isinstance(blob, (str, type(u''))):
+                text = blob.encode('utf-8')
+                parts.append(struct.pack('<BI', 2, len(text)))
+                parts.append(text)
+            else:
+                dtype = blob.dtype.str.encode('ascii')
+                data = blob.tobytes()
+                parts.append(struct.pack('<BI', 3, len(data)))
+                parts.append(struct.pack('<I', len(dtype)))
+                parts.append(dtype)
+                parts.append(data)
+
+        return b''.join(parts)
+
+    @staticmethod
+    def deserialize(_data):
+        """Create a recorder from a serialised stream
+
+        Args:
+            _data: The bytes returned by serialize
+
+        Returns:
+            A CommandRecorder holding the commands
+        """
+
+        magic, version, numWords, numBlobs, lowestName = struct.unpack_from('<4sIIIi', _data, 0)
+        if magic != b'GLCS' or version != 2:
+            raise ValueError('Not a GL command stream')
+
+        # Keep new placeholder names below the ones in the stream
+        with CommandRecorder.s_nameLock:
+            CommandRecorder.s_nextName = min(CommandRecorder.s_nextName, lowestName - 1)
+
+        offset = struct.calcsize('<4sIIIi')
+        recorder = CommandRecorder()
+        recorder.m_lowestName = lowestName
+        recorder.m_words = array.array('d', numpy.frombuffer(_data, '<f8', numWords, offset).tolist())
+        offset += 8 * numWords
+
+        for i in range(numBlobs):
+            kind, length = struct.unpack_from('<BI', _data, offset)
+            offset += struct.calcsize('<BI')
+            if kind == 0:
+                recorder.m_blobs.append(None)
+            elif kind == 1:
+                recorder.m_blobs.append(_data[offset:offset + length])
+            elif kind == 2:
+                recorder.m_blobs.append(_data[offset:offset + length].decode('utf-8'))
+            else:
+                dtypeLength = struct.unpack_from('<I', _data, offset)[0]
+                offset += 4
+                dtype = numpy.dtype(_data[offset:offset + dtypeLength].decode('ascii'))
+                offset += dtypeLength
+                recorder.m_blobs.append(numpy.frombuffer(_data[offset:offset + length], dtype).copy())
+            offset += length
+
+        recorder.m_numCommands = sum(1 for command in recorder.commands())
+        return recorder
@@ -0,0 +1,45 @@
+import sys
+
+
+class Config(object):
+    """This class configures PyOpenGL for speed, it must be used before OpenGL.GL is imported"""
+
+    # The array handlers kept when only NumPy arrays are used, None and strings are kept for
+    # buffer allocation and shader sources, and ctypes for the attribute offsets
+    s_arrayHandlers = ['none', 'numpy', 'bytes', 'str', 'unicode', 'ctypesarrays', 'ctypesparameter', 'ctypespointer']
+
+    @staticmethod
+    def fastPath(_errorChecking=False, _accelerate=True, _numpyOnly=True):
+        """Turn off the per-call checks PyOpenGL wraps every GL function with
+
+        Args:
+            _errorChecking: Whether glGetError is checked after every call
+            _accelerate: Whether to use the OpenGL_accelerate extension if it is installed
+            _numpyOnly: Whether to remove the array handlers for lists, numbers and buffers, and raise
+                        an error instead of silently copying data that is not in the right format
+
+        Returns:
+            True if PyOpenGL was configured
+            False if OpenGL.GL has already been imported, so the settings would not take effect
+        """
+
+        if 'OpenGL.GL' in sys.modules:
+            return False
+
+        import OpenGL
+        OpenGL.ERROR_CHECKING = _errorChecking
+        OpenGL.ERROR_LOGGING = False
+        OpenGL.FULL_LOGGING = False
+        OpenGL.CONTEXT_CHECKING = False
+        # Only offsets into buffer objects are passed as pointers, so the arrays do not need to be kept alive
+        OpenGL.STORE_POINTERS = False
+        OpenGL.ARRAY_SIZE_CHECKING = False
+        OpenGL.USE_ACCELERATE = _accelerate
+
+        if _numpyOnly:
+            from OpenGL.plugins import FormatHandler
+            FormatHandler.registry[:] = [handler for handler in FormatHandler.registry
+                                         if handler.name in Config.s_arrayHandlers]
+            OpenGL.ERROR_ON_COPY = True
+
+        return True
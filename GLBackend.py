@@ -0,0 +1,118 @@
+import threading
+import numpy
+import OpenGL.GL as gl
+import OpenGL.GL.shaders as shaders
+
+
+class GLBackend(object):
+    """This class issues GL commands directly to PyOpenGL and selects the backend used by each thread
+
+    VAO, ShaderStore and UniformBuffer issue their commands through GLBackend.current(), so a thread
+    can record its commands with a CommandRecorder instead of needing a live context. Objects created
+    while recording hold negative placeholder names until the recording is replayed, so they pass
+    their names through GLBackend.resolve before using them.
+    """
+
+    # The backend selected by each thread
+    s_local = threading.local()
+    # The backend used when a thread has not selected one
+    s_direct = None
+    # A dictionary of the placeholder names of replayed commands mapped to the real names
+    s_names = {}
+
+    def __getattr__(self, _name):
+        """Look up a GL function and cache it on the backend"""
+
+        if _name.startswith('__'):
+            raise AttributeError(_name)
+
+        function = getattr(gl, _name)
+        setattr(self, _name, function)
+        return function
+
+    def compileShader(self, _source, _type):
+        """Compile a shader
+
+        Args:
+            _source: The shader source
+            _type: The type of shader, such as gl.GL_VERTEX_SHADER
+
+        Returns:
+            The compiled shader
+        """
+
+        return shaders.compileShader(_source, _type)
+
+    def compileProgram(self, *_shaders):
+        """Link compiled shaders into a program
+
+        Args:
+            _shaders: The compiled shaders
+
+        Returns:
+            The shader program
+        """
+
+        return shaders.compileProgram(*_shaders)
+
+    def glDeleteVertexArrays(self, _count, _names):
+        """Delete vertex array objects
+
+        Args:
+            _count: The number of names
+            _names: A list of the names to delete
+        """
+
+        gl.glDeleteVertexArrays(_count, numpy.array(_names, dtype=numpy.uint32))
+
+    def glDeleteBuffers(self, _count, _names):
+        """Delete buffer objects
+
+        Args:
+            _count: The number of names
+            _names: A list of the names to delete
+        """
+
+        gl.glDeleteBuffers(_count, numpy.array(_names, dtype=numpy.uint32))
+
+    @staticmethod
+    def resolve(_name):
+        """Find the real name of a GL object
+
+        Args:
+            _name: A real name, or a placeholder name returned by a CommandRecorder
+
+        Returns:
+            The real name, or the placeholder if its recording has not been replayed yet
+        """
+
+        if _name < 0:
+            return GLBackend.s_names.get(_name, _name)
+
+        return _name
+
+    @staticmethod
+    def current():
+        """Get the backend used by the calling thread
+
+        Returns:
+            The selected backend, or the direct backend if none has been selected
+        """
+
+        backend = getattr(GLBackend.s_local, 'backend', None)
+        if backend is None:
+            if GLBackend.s_direct is None:
+                GLBackend.s_direct = GLBackend()
+            backend = GLBackend.s_direct
+
+        return backend
+
+    @staticmethod
+    def setCurrent(_backend):
+        """Select the backend used by the calling thread
+
+        Args:
+            _backend: The backend, or None to issue the commands directly
+        """
+
+        GLBackend.s_local.backend = _backend
@@ -0,0 +1,109 @@
+import sys
+import timeit
+
+try:
+    import __builtin__ as builtins
+except ImportError:
+    import builtins
+
+
+class ImportProfiler(object):
+    """This class measures how long each module takes to import
+
+    Usage:
+        python ImportProfiler.py Tools.Camera VAO
+    """
+
+    # The packages that are reported as heavy if they are imported
+    s_heavyModules = ['OpenGL', 'glfw', 'pyrr', 'numpy']
+
+    def __init__(self):
+        """The constructor"""
+
+        # A list of (module name, cumulative seconds, self seconds, depth) tuples in import order
+        self.m_records = []
+        # The time spent in nested imports for each active import
+        self.m_childTimes = []
+        self.m_originalImport = None
+
+    def start(self):
+        """Start recording imports"""
+
+        self.m_originalImport = builtins.__import__
+        builtins.__import__ = self.profiledImport
+
+    def stop(self):
+        """Stop recording imports"""
+
+        if self.m_originalImport is not None:
+            builtins.__import__ = self.m_originalImport
+            self.m_originalImport = None
+
+    def profiledImport(self, _name, *_args, **_kwargs):
+        """Time an import and record the modules it added to sys.modules"""
+
+        before = set(sys.modules)
+        depth = len(self.m_childTimes)
+        self.m_childTimes.append(0.0)
+        start = timeit.default_timer()
+        try:
+            return self.m_originalImport(_name, *_args, **_kwargs)
+        finally:
+            elapsed = timeit.default_timer() - start
+            childTime = self.m_childTimes.pop()
+            if self.m_childTimes:
+                self.m_childTimes[-1] += elapsed
+            # Python 2 adds None entries for failed implicit relative imports
+            added = [name for name in set(sys.modules) - before if sys.modules.get(name) is not None]
+            if added:
+                # Name the record after the imported module, which may be relative to its package
+                matches = [name for name in added if _name and (name == _name or name.endswith('.' + _name))]
+                name = min(matches or added, key=len)
+                self.m_records.append((name, elapsed, elapsed - childTime, depth))
+
+    @property
+    def records(self):
+        return self.m_records
+
+    def heavyModules(self):
+        """Find the heavy packages that were imported
+
+        Returns:
+            A list of the package names
+        """
+
+        return [name for name in ImportProfiler.s_heavyModules
+                if any(record[0] == name or record[0].startswith(name + '.') for record in self.m_records)]
+
+    def report(self, _limit=20):
+        """Create a report of the slowest imports
+
+        Args:
+            _limit: The maximum number of imports to list
+
+        Returns:
+            The report as a string
+        """
+
+        lines = ['%12s %12s  %s' % ('self (ms)', 'total (ms)', 'module')]
+        for name, total, own, depth in sorted(self.m_records, key=lambda record: -record[2])[:_limit]:
+            lines.append('%12.3f %12.3f  %s%s' % (own * 1000.0, total * 1000.0, '  ' * depth, name))
+
+        total = sum(record[1] for record in self.m_records if record[3] == 0)
+        lines.append('Total: %.3f ms' % (total * 1000.0))
+        heavy = self.heavyModules()
+        if heavy:
+            lines.append('Heavy packages imported: %s' % ', '.join(heavy))
+
+        return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    profiler = ImportProfiler()
+    profiler.start()
+    try:
+        for moduleName in sys.argv[1:]:
+            __import__(moduleName)
+    finally:
+        profiler.stop()
+    sys.stdout.write(profiler.report() + '\n')
@@ -0,0 +1,154 @@
+import numpy
+import VAO
+from Tools.MeshOptimizer import MeshOptimizer
+from Tools.MeshSimplifier import MeshSimplifier
+
+
+class LOD(object):
+    """This class stores progressively simplified levels of detail of a mesh in a single VAO
+
+    All levels share the vertex buffer, and each level is a range of the element buffer.
+    """
+
+    def __init__(self, _vertices, _indices=None, _stride=6, _ratios=[1.0, 0.5, 0.25, 0.125], _thresholds=None):
+        """The constructor
+
+        Args:
+            _vertices: The interleaved vertex data, with the position as the first 3 values of each vertex
+            _indices: The triangle indices, or None if every 3 vertices form a triangle
+            _stride: The number of floats per vertex
+            _ratios: The fraction of the triangles to keep for each level, in decreasing order
+            _thresholds: The screen sizes below which each level after the first is used, as a fraction
+                         of the screen height in decreasing order. By default each level halves the size.
+        """
+
+        if _indices is None:
+            vertices, indices = MeshSimplifier.weld(_vertices, _stride)
+        else:
+            vertices = numpy.asarray(_vertices, dtype=numpy.float32).reshape(-1, _stride)
+            indices = numpy.asarray(_indices).reshape(-1, 3)
+
+        # Build the levels and store the range of the element buffer used by each, the levels after the
+        # simplification stopped at the error bound share the range of the previous level
+        levels = MeshSimplifier(vertices[:, :3], indices).buildLevels(_ratios)
+        ranges = numpy.cumsum([0] + [level is not previous for previous, level in zip(levels[:-1], levels[1:])])
+        levels = [level for i, level in enumerate(levels) if i == 0 or level is not levels[i - 1]]
+
+        # Order each level for the vertex cache and the shared vertices in the order they are first used
+        levels = [level[MeshOptimizer.vertexCacheOrder(level, len(vertices))] for level in levels]
+        order, remap = MeshOptimizer.fetchRemap(numpy.concatenate(levels), len(vertices))
+        vertices = vertices[order]
+        levels = [remap[level].astype(numpy.uint32) for level in levels]
+        counts = [3 * len(level) for level in levels]
+        firsts = numpy.cumsum([0] + counts[:-1])
+        self.m_levels = [(int(firsts[i]), counts[i]) for i in ranges]
+
+        if _thresholds is None:
+            self.m_thresholds = numpy.array([0.25 * 0.5 ** i for i in range(len(self.m_levels) - 1)])
+        else:
+            self.m_thresholds = numpy.array(_thresholds, dtype=numpy.float64)
+        self.m_currentLevel = 0
+
+        # The bounding sphere of the mesh
+        positions = vertices[:, :3].astype(numpy.float64)
+        self.m_center = 0.5 * (positions.min(axis=0) + positions.max(axis=0))
+        self.m_radius = numpy.linalg.norm(positions - self.m_center, axis=1).max()
+
+        self.m_vao = VAO.VAO()
+        self.m_vao.genArrayBuffer(vertices.ravel())
+        self.m_vao.genElementBuffer(numpy.concatenate(levels).ravel())
+        self.m_vao.numVertices = len(vertices)
+        self.m_vao.numElements = sum(counts)
+
+    @property
+    def vao(self):
+        return self.m_vao
+
+    @property
+    def numLevels(self):
+        return len(self.m_levels)
+
+    @property
+    def levels(self):
+        """Get the element buffer range of each level
+
+        Returns:
+            A list of (first, count) tuples
+        """
+
+        return self.m_levels
+
+    @property
+    def currentLevel(self):
+        return self.m_currentLevel
+
+    @currentLevel.setter
+    def currentLevel(self, _level):
+        self.m_currentLevel = min(max(int(_level), 0), len(self.m_levels) - 1)
+
+    def screenSizes(self, _modelMatrices, _vpMatrix):
+        """Compute the projected size of the bounding sphere for a batch of objects
+
+        Args:
+            _modelMatrices: The model matrices as an array of shape (k, 4, 4)
+            _vpMatrix: A VPMatrix or Camera providing the view-projection and projection matrices
+
+        Returns:
+            The projected diameters as a fraction of the screen height
+        """
+
+        models = numpy.asarray(_modelMatrices, dtype=numpy.float64).reshape(-1, 4, 4)
+        vp = numpy.asarray(_vpMatrix.matrix, dtype=numpy.float64)
+        projection = numpy.asarray(_vpMatrix.projectionMatrix, dtype=numpy.float64)
+
+        # Transform the centre to clip space, the matrices multiply row vectors
+        center = numpy.append(self.m_center, 1.0)
+        clip = numpy.einsum('j,kjl->kl', center, models).dot(vp)
+        w = numpy.maximum(numpy.abs(clip[:, 3]), 1e-6)
+
+        # Use the largest axis scale of each model matrix for the radius
+        scale = numpy.sqrt(numpy.max(numpy.sum(models[:, :3, :3] ** 2, axis=2), axis=1))
+
+        return self.m_radius * scale * projection[1, 1] / w
+
+    def selectLevels(self, _modelMatrices, _vpMatrix):
+        """Select the level of detail for a batch of objects
+
+        Args:
+            _modelMatrices: The model matrices as an array of shape (k, 4, 4)
+            _vpMatrix: A VPMatrix or Camera providing the view-projection and projection matrices
+
+        Returns:
+            An array of the level for each object
+        """
+
+        sizes = self.screenSizes(_modelMatrices, _vpMatrix)
+        return numpy.sum(sizes[:, None] < self.m_thresholds[None, :], axis=1)
+
+    def select(self, _modelMatrix, _vpMatrix):
+        """Select the level of detail for a single object and make it the current level
+
+        Args:
+            _modelMatrix: The model matrix of the object
+            _vpMatrix: A VPMatrix or Camera providing the view-projection and projection matrices
+
+        Returns:
+            The selected level
+        """
+
+        self.m_currentLevel = int(self.selectLevels(_modelMatrix, _vpMatrix)[0])
+        return self.m_currentLevel
+
+    def draw(self, _level=None):
+        """Draw a level of detail
+
+        Args:
+            _level: The level to draw, or None to draw the current level
+        """
+
+        level = _level
+        if level is None:
+            level = self.m_currentLevel
+
+        first, count = self.m_levels[level]
+        self.m_vao.drawElements(first, count)
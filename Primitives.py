@@ -1,6 +1,9 @@
 import math
+import numpy
+import LOD
 import VAO
 import OpenGL.GL as gl
+from Tools.MeshOptimizer import MeshOptimizer
 
 
 class Primitives(object):
@@ -8,6 +11,9 @@ class Primitives(object):
 
     # A dictionary of VAOs mapped to names
     s_VAOs = {}
+    # A dictionary of (vertices, indices) tuples mapped to names, where the vertices have shape (n, 6) and the
+    # indices are None if every 3 vertices form a triangle
+    s_meshes = {}
 
     def __init__(self):
         """The constructor"""
@@ -15,10 +21,34 @@ class Primitives(object):
         pass
 
     def draw(self, _name):
-        if _name in Primitives.s_VAOs:
-            Primitives.s_VAOs[_name].draw()
-        else:
+        if _name not in Primitives.s_VAOs:
             print "Primitive does not exist"
+            return
+
+        # Meshes created with createMesh are indexed, while levels of detail draw their own element ranges
+        vao = Primitives.s_VAOs[_name]
+        if isinstance(vao, VAO.VAO) and Primitives.s_meshes[_name][1] is not None:
+            vao.drawElements()
+        else:
+            vao.draw()
+
+    def selectLOD(self, _name, _modelMatrix, _vpMatrix):
+        """Select the level of detail of a primitive created with createLOD
+
+        Args:
+            _name: The name of the primitive
+            _modelMatrix: The model matrix of the object
+            _vpMatrix: A VPMatrix or Camera providing the view-projection and projection matrices
+
+        Returns:
+            The selected level, or None if the primitive does not have levels of detail
+        """
+
+        if isinstance(Primitives.s_VAOs.get(_name), LOD.LOD):
+            return Primitives.s_VAOs[_name].select(_modelMatrix, _vpMatrix)
+        else:
+            print "Primitive does not have levels of detail"
+            return None
 
     def createCube(self, _name, _length=1.0, _subdivisionsX=1, _subdivisionsY=1, _subdivisionsZ=1):
         '''Create a cube primitive'''
@@ -92,3 +122,65 @@ class Primitives(object):
         vao.setVertexAttrib(1, 3, gl.GL_FLOAT, gl.GL_FALSE, 24, 12)
 
         Primitives.s_VAOs[_name] = vao
+        Primitives.s_meshes[_name] = (numpy.array(vertices, dtype=numpy.float32).reshape(-1, 6), None)
+
+    def createMesh(self, _name, _vertices, _indices=None, _optimize=True):
+        """Create a primitive from an indexed mesh
+
+        Args:
+            _name: The name of the primitive
+            _vertices: The interleaved vertex data, as position and normal for each vertex
+            _indices: The triangle indices, or None if every 3 vertices form a triangle
+            _optimize: Whether to reorder the triangles and vertices for the vertex cache and overdraw
+
+        Returns:
+            The MeshOptimizer of the mesh, which measures the cache statistics before and after optimising when
+            they are read, or None if the primitive already exists
+        """
+
+        if _name in Primitives.s_VAOs:
+            print "VAO already exists"
+            return
+
+        optimizer = MeshOptimizer(_vertices, _indices, 6)
+        if _optimize:
+            optimizer.optimize()
+
+        vao = VAO.VAO()
+        vao.genArrayBuffer(optimizer.vertices.ravel())
+        vao.genElementBuffer(optimizer.indices.ravel())
+        vao.numVertices = len(optimizer.vertices)
+        vao.numElements = 3 * len(optimizer.indices)
+
+        # Set the attrib pointers
+        vao.setVertexAttrib(0, 3, gl.GL_FLOAT, gl.GL_FALSE, 24, 0)
+        vao.setVertexAttrib(1, 3, gl.GL_FLOAT, gl.GL_FALSE, 24, 12)
+
+        Primitives.s_VAOs[_name] = vao
+        Primitives.s_meshes[_name] = (optimizer.vertices, optimizer.indices)
+        return optimizer
+
+    def createLOD(self, _name, _vertices, _indices=None, _ratios=[1.0, 0.5, 0.25, 0.125], _thresholds=None):
+        """Create a primitive with levels of detail from a mesh
+
+        Args:
+            _name: The name of the primitive
+            _vertices: The interleaved vertex data, as position and normal for each vertex
+            _indices: The triangle indices, or None if every 3 vertices form a triangle
+            _ratios: The fraction of the triangles to keep for each level, in decreasing order
+            _thresholds: The screen sizes below which each level after the first is used
+        """
+
+        if _name in Primitives.s_VAOs:
+            print "VAO already exists"
+            return
+
+        lod = LOD.LOD(_vertices, _indices, 6, _ratios, _thresholds)
+
+        # Set the attrib pointers
+        lod.vao.setVertexAttrib(0, 3, gl.GL_FLOAT, gl.GL_FALSE, 24, 0)
+        lod.vao.setVertexAttrib(1, 3, gl.GL_FLOAT, gl.GL_FALSE, 24, 12)
+
+        Primitives.s_VAOs[_name] = lod
+        indices = None if _indices is None else numpy.asarray(_indices, dtype=numpy.uint32).reshape(-1, 3)
+        Primitives.s_meshes[_name] = (numpy.asarray(_vertices, dtype=numpy.float32).reshape(-1, 6), indices)
@@ -1,5 +1,5 @@
 import OpenGL.GL as gl
-import OpenGL.GL.shaders as shaders
+from GLBackend import GLBackend
 
 
 class ShaderStore(object):
@@ -9,6 +9,8 @@ class ShaderStore(object):
     m_shaders = {}
     # Currently active shader
     m_currentShader = None
+    # A dictionary of uniform block names mapped to binding points
+    m_uniformBlocks = {}
 
     @staticmethod
     def createShader(_name, _vertexShader, _fragmentShader):
@@ -21,14 +23,60 @@ class ShaderStore(object):
 
         # Check if the shader does not already exist
         if _name not in ShaderStore.m_shaders:
+            backend = GLBackend.current()
             # Load and compile the vertex shader
             vs = file(_vertexShader).read()
-            compiledVS = shaders.compileShader(vs, gl.GL_VERTEX_SHADER)
+            compiledVS = backend.compileShader(vs, gl.GL_VERTEX_SHADER)
             # Load and compile the fragment shader
             fs = file(_fragmentShader).read()
-            compiledFS = shaders.compileShader(fs, gl.GL_FRAGMENT_SHADER)
+            compiledFS = backend.compileShader(fs, gl.GL_FRAGMENT_SHADER)
             # Create the shader program and store in the dictionary
-            ShaderStore.m_shaders[_name] = shaders.compileProgram(compiledVS, compiledFS)
+            ShaderStore.m_shaders[_name] = backend.compileProgram(compiledVS, compiledFS)
+            # Connect any registered uniform blocks the program declares
+            for blockName, bindingPoint in ShaderStore.m_uniformBlocks.items():
+                ShaderStore.bindUniformBlock(_name, blockName, bindingPoint)
+
+    @staticmethod
+    def registerUniformBlock(_blockName, _bindingPoint):
+        """Register a uniform block so it is connected to every shader program
+
+        Programs that are already linked are connected immediately, programs created later
+        are connected when they are linked by createShader.
+
+        Args:
+            _blockName: The name of the uniform block in the GLSL source
+            _bindingPoint: The uniform buffer binding point to connect the block to
+        """
+
+        ShaderStore.m_uniformBlocks[_blockName] = _bindingPoint
+        for name in ShaderStore.m_shaders:
+            ShaderStore.bindUniformBlock(name, _blockName, _bindingPoint)
+
+    @staticmethod
+    def bindUniformBlock(_name, _blockName, _bindingPoint):
+        """Connect a uniform block in a shader program to a binding point
+
+        Args:
+            _name: The name of the shader
+            _blockName: The name of the uniform block in the GLSL source
+            _bindingPoint: The uniform buffer binding point to connect the block to
+
+        Returns:
+            True if the shader declares the block
+            False if the shader or the block does not exist
+        """
+
+        if _name not in ShaderStore.m_shaders:
+            return False
+
+        program = GLBackend.resolve(ShaderStore.m_shaders[_name])
+        backend = GLBackend.current()
+        index = backend.glGetUniformBlockIndex(program, _blockName)
+        if index == gl.GL_INVALID_INDEX:
+            return False
+
+        backend.glUniformBlockBinding(program, index, _bindingPoint)
+        return True
 
     @staticmethod
     def use(_name):
@@ -44,11 +92,11 @@ class ShaderStore(object):
 
         # Check if the shader exists
         if _name in ShaderStore.m_shaders:
-            gl.glUseProgram(ShaderStore.m_shaders[_name])
+            GLBackend.current().glUseProgram(GLBackend.resolve(ShaderStore.m_shaders[_name]))
             ShaderStore.m_currentShader = _name
             return True
         elif _name == 0:
-            gl.glUseProgram(0)
+            GLBackend.current().glUseProgram(0)
             ShaderStore.m_currentShader = None
             return True
         else:
@@ -68,7 +116,7 @@ class ShaderStore(object):
 
         # Check if the shader exists
         if _name in ShaderStore.m_shaders:
-            return ShaderStore.m_shaders[_name]
+            return GLBackend.resolve(ShaderStore.m_shaders[_name])
         else:
             return None
 
@@ -77,6 +125,6 @@ class ShaderStore(object):
         """Get the shader currently in use"""
 
         if ShaderStore.m_currentShader is not None:
-            return ShaderStore.m_shaders[ShaderStore.m_currentShader]
+            return GLBackend.resolve(ShaderStore.m_shaders[ShaderStore.m_currentShader])
         else:
             return None
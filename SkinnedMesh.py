@@ -0,0 +1,104 @@
+import OpenGL.GL as gl
+import numpy
+import VAO
+from Tools.Skeleton import Skeleton
+
+
+class SkinnedMesh(object):
+    """This class skins many instances of a mesh on the CPU and streams the vertices into a single VAO
+
+    The vertices use the same layout as Primitives, a position and a normal for each vertex.
+    """
+
+    def __init__(self, _skeleton, _positions, _normals, _boneIndices, _weights, _indices=None, _numInstances=1):
+        """The constructor
+
+        Args:
+            _skeleton: The Skeleton driving the mesh
+            _positions: The bind pose positions with shape (v, 3)
+            _normals: The bind pose normals with shape (v, 3)
+            _boneIndices: The bones influencing each vertex with shape (v, k)
+            _weights: The weight of each influence with shape (v, k)
+            _indices: The triangle indices, or None if every 3 vertices form a triangle
+            _numInstances: The number of instances to skin and draw together
+        """
+
+        self.m_skeleton = _skeleton
+        self.m_positions = numpy.asarray(_positions, dtype=numpy.float64).reshape(-1, 3)
+        self.m_normals = numpy.asarray(_normals, dtype=numpy.float64).reshape(-1, 3)
+        self.m_boneIndices = numpy.asarray(_boneIndices, dtype=numpy.int64).reshape(len(self.m_positions), -1)
+        self.m_weights = numpy.asarray(_weights, dtype=numpy.float64).reshape(len(self.m_positions), -1)
+        self.m_numInstances = _numInstances
+
+        # The skinned vertices of every instance, starting in the bind pose
+        numVertices = len(self.m_positions)
+        self.m_vertices = numpy.empty((_numInstances, numVertices, 6), dtype=numpy.float32)
+        self.m_vertices[..., :3] = self.m_positions
+        self.m_vertices[..., 3:] = self.m_normals
+
+        self.m_vao = VAO.VAO()
+        self.m_vao.genArrayBuffer(self.m_vertices.ravel(), gl.GL_STREAM_DRAW)
+        self.m_vao.numVertices = _numInstances * numVertices
+        self.m_isIndexed = _indices is not None
+        if self.m_isIndexed:
+            # Repeat the indices for each instance, offset to its vertices
+            indices = numpy.asarray(_indices, dtype=numpy.uint32).ravel()
+            offsets = numpy.arange(_numInstances, dtype=numpy.uint32) * numVertices
+            indices = (indices[None, :] + offsets[:, None]).ravel()
+            self.m_vao.genElementBuffer(indices, gl.GL_STATIC_DRAW)
+            self.m_vao.numElements = len(indices)
+
+        # Set the attrib pointers
+        self.m_vao.setVertexAttrib(0, 3, gl.GL_FLOAT, gl.GL_FALSE, 24, 0)
+        self.m_vao.setVertexAttrib(1, 3, gl.GL_FLOAT, gl.GL_FALSE, 24, 12)
+
+    @property
+    def vao(self):
+        return self.m_vao
+
+    @property
+    def numInstances(self):
+        return self.m_numInstances
+
+    @property
+    def vertices(self):
+        """Get the skinned vertices
+
+        Returns:
+            The interleaved positions and normals with shape (n, v, 6)
+        """
+
+        return self.m_vertices
+
+    def update(self, _localMatrices):
+        """Skin every instance and upload the vertices
+
+        Args:
+            _localMatrices: The local bone matrices of each instance with shape (n, b, 4, 4)
+        """
+
+        palettes = self.m_skeleton.palettes(_localMatrices)
+        positions, normals = Skeleton.skin(palettes, self.m_positions, self.m_normals,
+                                           self.m_boneIndices, self.m_weights)
+        self.m_vertices[..., :3] = positions
+        self.m_vertices[..., 3:] = normals
+        self.m_vao.updateArrayBuffer(self.m_vertices.ravel())
+
+    def animate(self, _clip, _times, _loop=True):
+        """Sample a clip for every instance, then skin and upload the vertices
+
+        Args:
+            _clip: The AnimationClip to sample
+            _times: The time of each instance in seconds, with shape (n,)
+            _loop: Whether the times wrap around the duration of the clip
+        """
+
+        self.update(_clip.sample(_times, _loop))
+
+    def draw(self):
+        """Draw every instance"""
+
+        if self.m_isIndexed:
+            self.m_vao.drawElements()
+        else:
+            self.m_vao.draw()
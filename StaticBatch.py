@@ -0,0 +1,245 @@
+import numpy
+import VAO
+import OpenGL.GL as gl
+from Primitives import Primitives
+from ShaderStore import ShaderStore
+
+
+class StaticBatch(object):
+    """This class merges many static instances of primitives into a few pre-transformed VAOs
+
+    Each instance is a primitive created with Primitives, a model matrix and a material, which is the name of
+    the shader in ShaderStore it is drawn with. Instances with the same material are packed into chunks of
+    up to s_maxChunkVertices vertices, and each chunk is drawn with a single call. Changing an instance only
+    marks its chunk dirty, and build transforms the vertices of the dirty chunks again.
+    """
+
+    # The maximum number of vertices in a chunk
+    s_maxChunkVertices = 1 << 18
+
+    def __init__(self):
+        """The constructor"""
+
+        # A dictionary of instance ids mapped to [primitive name, model matrix, material, chunk index]
+        self.m_instances = {}
+        self.m_nextId = 0
+        # A list of chunks, each a dictionary with the material, instance ids, number of vertices, VAO and
+        # whether the vertices or the whole layout need rebuilding
+        self.m_chunks = []
+
+    @property
+    def numInstances(self):
+        return len(self.m_instances)
+
+    @property
+    def numChunks(self):
+        return len(self.m_chunks)
+
+    @property
+    def chunks(self):
+        return self.m_chunks
+
+    def add(self, _name, _modelMatrix, _material):
+        """Add an instance of a primitive
+
+        Args:
+            _name: The name of a primitive created with Primitives
+            _modelMatrix: The model matrix of the instance, which multiplies row vectors like Transformation.matrix
+            _material: The name of the shader to draw the instance with
+
+        Returns:
+            The id of the instance, or None if the primitive does not exist
+        """
+
+        if _name not in Primitives.s_meshes:
+            print "Primitive does not exist"
+            return None
+
+        numVertices = len(Primitives.s_meshes[_name][0])
+
+        # Find a chunk of the same material with room for the vertices
+        chunkIndex = None
+        for i, chunk in enumerate(self.m_chunks):
+            if chunk['material'] == _material and \
+                    chunk['numVertices'] + numVertices <= StaticBatch.s_maxChunkVertices:
+                chunkIndex = i
+                break
+
+        if chunkIndex is None:
+            chunkIndex = len(self.m_chunks)
+            self.m_chunks.append({'material': _material, 'instances': [], 'numVertices': 0,
+                                  'vao': None, 'dirty': True, 'resized': True})
+
+        instanceId = self.m_nextId
+        self.m_nextId += 1
+        self.m_instances[instanceId] = [_name, numpy.asarray(_modelMatrix, dtype=numpy.float64).reshape(4, 4),
+                                        _material, chunkIndex]
+
+        chunk = self.m_chunks[chunkIndex]
+        chunk['instances'].append(instanceId)
+        chunk['numVertices'] += numVertices
+        chunk['dirty'] = True
+        chunk['resized'] = True
+
+        return instanceId
+
+    def remove(self, _id):
+        """Remove an instance
+
+        Args:
+            _id: The id returned by add
+
+        Returns:
+            True if the instance existed
+            False if the instance does not exist
+        """
+
+        if _id not in self.m_instances:
+            return False
+
+        name, modelMatrix, material, chunkIndex = self.m_instances.pop(_id)
+        chunk = self.m_chunks[chunkIndex]
+        chunk['instances'].remove(_id)
+        chunk['numVertices'] -= len(Primitives.s_meshes[name][0])
+        chunk['dirty'] = True
+        chunk['resized'] = True
+
+        return True
+
+    def setModelMatrix(self, _id, _modelMatrix):
+        """Move an instance
+
+        Args:
+            _id: The id returned by add
+            _modelMatrix: The new model matrix
+
+        Returns:
+            True if the instance exists
+            False if the instance does not exist
+        """
+
+        if _id not in self.m_instances:
+            return False
+
+        instance = self.m_instances[_id]
+        instance[1] = numpy.asarray(_modelMatrix, dtype=numpy.float64).reshape(4, 4)
+        self.m_chunks[instance[3]]['dirty'] = True
+
+        return True
+
+    @staticmethod
+    def transform(_vertices, _modelMatrices):
+        """Transform the vertices of a mesh by many model matrices at once
+
+        Args:
+            _vertices: The interleaved position and normal of each vertex with shape (v, 6)
+            _modelMatrices: The model matrices with shape (k, 4, 4)
+
+        Returns:
+            The transformed vertices with shape (k, v, 6)
+        """
+
+        positions = numpy.hstack([_vertices[:, :3], numpy.ones((len(_vertices), 1))])
+        # The normal matrix is the inverse of the upper 3x3 like MVP.N, applied transposed to row vectors
+        normalMatrices = numpy.linalg.inv(_modelMatrices[:, :3, :3])
+
+        transformed = numpy.empty((len(_modelMatrices), len(_vertices), 6), dtype=numpy.float32)
+        transformed[..., :3] = numpy.einsum('vj,kjl->kvl', positions, _modelMatrices)[..., :3]
+        normals = numpy.einsum('vj,klj->kvl', _vertices[:, 3:6], normalMatrices)
+        normals /= numpy.maximum(numpy.linalg.norm(normals, axis=-1), 1e-12)[..., None]
+        transformed[..., 3:] = normals
+
+        return transformed
+
+    def buildChunk(self, _chunk):
+        """Transform and upload the vertices of a chunk
+
+        Args:
+            _chunk: The chunk to build
+        """
+
+        # Group the instances by primitive so each mesh is transformed in one operation
+        groups = {}
+        for instanceId in _chunk['instances']:
+            name, modelMatrix = self.m_instances[instanceId][:2]
+            groups.setdefault(name, []).append(modelMatrix)
+
+        vertices = []
+        indices = []
+        offset = 0
+        for name in sorted(groups):
+            meshVertices, meshIndices = Primitives.s_meshes[name]
+            matrices = numpy.array(groups[name])
+            vertices.append(StaticBatch.transform(meshVertices, matrices).reshape(-1, 6))
+
+            if meshIndices is None:
+                meshIndices = numpy.arange(len(meshVertices))
+            meshIndices = numpy.asarray(meshIndices, dtype=numpy.int64).ravel()
+            offsets = offset + numpy.arange(len(matrices)) * len(meshVertices)
+            indices.append((meshIndices[None, :] + offsets[:, None]).ravel())
+            offset += len(matrices) * len(meshVertices)
+
+        if not vertices:
+            if _chunk['vao'] is not None:
+                _chunk['vao'].delete()
+            _chunk['vao'] = None
+            return
+
+        vertices = numpy.concatenate(vertices).ravel()
+
+        if _chunk['resized'] or _chunk['vao'] is None:
+            indices = numpy.concatenate(indices).astype(numpy.uint32)
+            if _chunk['vao'] is not None:
+                _chunk['vao'].delete()
+
+            vao = VAO.VAO()
+            vao.genArrayBuffer(vertices)
+            vao.genElementBuffer(indices)
+            vao.numVertices = offset
+            vao.numElements = len(indices)
+
+            # Set the attrib pointers
+            vao.setVertexAttrib(0, 3, gl.GL_FLOAT, gl.GL_FALSE, 24, 0)
+            vao.setVertexAttrib(1, 3, gl.GL_FLOAT, gl.GL_FALSE, 24, 12)
+            _chunk['vao'] = vao
+        else:
+            # Only the model matrices changed, so the layout and element buffer are the same
+            _chunk['vao'].updateArrayBuffer(vertices)
+
+    def build(self):
+        """Rebuild the dirty chunks
+
+        Returns:
+            The number of chunks rebuilt
+        """
+
+        rebuilt = 0
+        for chunk in self.m_chunks:
+            if chunk['dirty']:
+                self.buildChunk(chunk)
+                chunk['dirty'] = False
+                chunk['resized'] = False
+                rebuilt += 1
+
+        return rebuilt
+
+    def draw(self):
+        """Draw every chunk with its material, building the dirty chunks first
+
+        Returns:
+            The number of draw calls
+        """
+
+        self.build()
+
+        drawCalls = 0
+        for material in sorted(set(chunk['material'] for chunk in self.m_chunks)):
+            if not ShaderStore.use(material):
+                print "Shader does not exist"
+                continue
+            for chunk in self.m_chunks:
+                if chunk['material'] == material and chunk['vao'] is not None:
+                    chunk['vao'].drawElements()
+                    drawCalls += 1
+
+        return drawCalls
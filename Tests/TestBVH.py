@@ -0,0 +1,119 @@
+"""The tests for frustum queries and ray casts against the flat array BVH
+
+Run from the repository root with: python -m unittest discover -s Tests -p "Test*.py"
+"""
+
+import unittest
+import warnings
+import numpy
+import pyrr
+from Tools.BVH import BVH
+from Tools.VPMatrix import VPMatrix
+
+
+def randomMatrices(_random, _count):
+    """Rotate, scale and place boxes at random"""
+
+    matrices = numpy.empty((_count, 4, 4))
+    for i in range(_count):
+        rotation = numpy.array(pyrr.matrix44.create_from_eulers(_random.uniform(-numpy.pi, numpy.pi, 3)))
+        scale = numpy.diag(list(_random.uniform(0.5, 2.0, 3)) + [1.0])
+        matrices[i] = scale.dot(rotation)
+        matrices[i, 3, :3] = _random.uniform(-60.0, 60.0, 3)
+    return matrices
+
+
+class TestBVH(unittest.TestCase):
+
+    def setUp(self):
+        self.m_random = numpy.random.RandomState(0)
+        self.m_localBounds = numpy.array([[-0.5, -0.5, -0.5], [0.5, 0.5, 0.5]])
+        self.m_matrices = randomMatrices(self.m_random, 1000)
+
+        # A leaf size that leaves some leaves empty
+        self.m_bvh = BVH(self.m_localBounds, self.m_matrices, _leafSize=6)
+
+        self.m_vpMatrix = VPMatrix()
+        self.m_vpMatrix.createViewMatrix([0, 0, 40], [10, 5, 0], [0, 1, 0])
+        self.m_vpMatrix.createPerspectiveMatrix(45.0, 1.5, 0.1, 80.0)
+
+    def bruteForceFrustum(self):
+        """Find the boxes with a corner inside every plane"""
+
+        planes = self.m_vpMatrix.frustumPlanes
+        # Whether each corner uses the minimum or maximum along each axis
+        bits = numpy.array([[(i >> axis) & 1 for axis in range(3)] for i in range(8)])
+        corners = self.m_bvh.bounds[:, bits, numpy.arange(3)]
+        furthest = (corners.dot(planes[:, :3].T) + planes[:, 3]).max(axis=1)
+        return numpy.nonzero((furthest >= 0.0).all(axis=1))[0]
+
+    def bruteForceRay(self, _origin, _direction):
+        """Find the nearest box hit by a ray with the slab test"""
+
+        t0 = (self.m_bvh.bounds[:, 0] - _origin) / _direction
+        t1 = (self.m_bvh.bounds[:, 1] - _origin) / _direction
+        tNear = numpy.maximum(numpy.minimum(t0, t1).max(axis=1), 0.0)
+        tFar = numpy.maximum(t0, t1).min(axis=1)
+        hit = numpy.nonzero(tNear <= tFar)[0]
+        if len(hit) == 0:
+            return None
+        nearest = hit[numpy.argmin(tNear[hit])]
+        return nearest, tNear[nearest]
+
+    def assertQueriesMatch(self):
+        visible = self.m_bvh.frustumQuery(self.m_vpMatrix)
+        expected = self.bruteForceFrustum()
+        self.assertGreater(len(expected), 50)
+        self.assertEqual(sorted(visible.tolist()), expected.tolist())
+
+        for i in range(20):
+            origin = self.m_random.uniform(-70.0, 70.0, 3)
+            direction = self.m_random.uniform(-1.0, 1.0, 3)
+            hit = self.m_bvh.rayCast(origin, direction)
+            expected = self.bruteForceRay(origin, direction)
+            if expected is None:
+                self.assertIsNone(hit)
+            else:
+                self.assertEqual(hit[0], expected[0])
+                self.assertAlmostEqual(hit[1], expected[1])
+
+    def testQueries(self):
+        """The queries match testing every object"""
+
+        self.assertQueriesMatch()
+
+    def testRefit(self):
+        """The queries match testing every object after some and then all of the objects move"""
+
+        moved = self.m_random.choice(len(self.m_matrices), 300, replace=False)
+        self.m_bvh.refit(randomMatrices(self.m_random, 300), moved)
+        self.assertQueriesMatch()
+
+        self.m_bvh.refit(randomMatrices(self.m_random, len(self.m_matrices)))
+        self.assertQueriesMatch()
+
+        # Refitting nothing keeps the tree as it is
+        self.m_bvh.refit(numpy.zeros((0, 4, 4)), [])
+        self.assertQueriesMatch()
+
+    def testNoWarnings(self):
+        """Empty leaves do not raise floating point warnings"""
+
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            self.m_bvh.frustumQuery(self.m_vpMatrix)
+            self.m_bvh.rayCast([0.0, 0.0, 0.0], [1.0, 0.0, 0.0])
+        messages = [str(warning.message) for warning in caught if issubclass(warning.category, RuntimeWarning)]
+        self.assertEqual(messages, [])
+
+    def testEmpty(self):
+        """A tree without objects finds nothing"""
+
+        bvh = BVH([])
+        self.assertEqual(bvh.numObjects, 0)
+        self.assertEqual(len(bvh.frustumQuery(self.m_vpMatrix)), 0)
+        self.assertIsNone(bvh.rayCast([0.0, 0.0, 0.0], [0.0, 0.0, -1.0]))
+
+
+if __name__ == '__main__':
+    unittest.main()
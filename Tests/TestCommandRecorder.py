@@ -0,0 +1,136 @@
+"""The tests for recording GL commands on one thread and replaying them on another
+
+Run from the repository root with: python -m unittest discover -s Tests -p "Test*.py"
+"""
+
+import threading
+import unittest
+from Benchmarks.MockGL import MockGL
+
+# The GL-facing modules must be imported after the mock is installed
+MockGL.install()
+
+from CommandRecorder import CommandRecorder
+from GLBackend import GLBackend
+from VAO import VAO
+
+
+class LoggingBackend(object):
+    """A backend that logs the calls and their arguments and passes them on to the direct backend"""
+
+    def __init__(self):
+        self.m_log = []
+        self.m_backend = GLBackend()
+
+    def __getattr__(self, _name):
+        if _name.startswith('__'):
+            raise AttributeError(_name)
+
+        function = getattr(self.m_backend, _name)
+
+        def log(*_args):
+            self.m_log.append((_name, _args))
+            return function(*_args)
+
+        return log
+
+
+def recordOnThread(_function):
+    """Record the commands issued by a function on a worker thread"""
+
+    recorder = CommandRecorder()
+
+    def work():
+        GLBackend.setCurrent(recorder)
+        try:
+            _function()
+        finally:
+            GLBackend.setCurrent(None)
+
+    thread = threading.Thread(target=work)
+    thread.start()
+    thread.join()
+    return recorder
+
+
+class TestCommandRecorder(unittest.TestCase):
+
+    def boundVertexArrays(self, _backend):
+        return [args[0] for name, args in _backend.m_log if name == 'glBindVertexArray' and args[0] != 0]
+
+    def testReplayDirectObject(self):
+        """An object created directly can be drawn by a recorded frame"""
+
+        vao = VAO()
+        vao.numVertices = 3
+        recorder = recordOnThread(vao.draw)
+
+        backend = LoggingBackend()
+        recorder.replay(backend)
+        self.assertEqual(self.boundVertexArrays(backend), [vao.m_vao])
+
+    def testReplayRecordedObject(self):
+        """An object created while recording can be used directly and recorded again after replaying"""
+
+        vaos = []
+
+        def create():
+            vao = VAO()
+            vao.genArrayBuffer([0.0] * 18)
+            vao.numVertices = 3
+            vaos.append(vao)
+
+        recorder = recordOnThread(create)
+        self.assertTrue(vaos[0].m_vao < 0)
+
+        names = recorder.replay(LoggingBackend())
+        realName = names[vaos[0].m_vao]
+        self.assertTrue(realName > 0)
+
+        backend = LoggingBackend()
+        GLBackend.setCurrent(backend)
+        try:
+            vaos[0].draw()
+        finally:
+            GLBackend.setCurrent(None)
+        self.assertEqual(self.boundVertexArrays(backend), [realName])
+
+        backend = LoggingBackend()
+        recordOnThread(vaos[0].draw).replay(backend)
+        self.assertEqual(self.boundVertexArrays(backend), [realName])
+
+    def testReplayDelete(self):
+        """Deleting an object while recording deletes its real name and buffers on replay"""
+
+        vao = VAO()
+        vao.genArrayBuffer([0.0] * 18)
+        names = [vao.m_vao, vao.m_vbo]
+        recorder = recordOnThread(vao.delete)
+
+        backend = LoggingBackend()
+        recorder.replay(backend)
+        deleted = dict((name, args) for name, args in backend.m_log if name.startswith('glDelete'))
+        self.assertEqual(deleted['glDeleteVertexArrays'], (1, [names[0]]))
+        self.assertEqual(deleted['glDeleteBuffers'], (1, [names[1]]))
+        self.assertEqual(recorder.redundantCalls(), {})
+
+    def testPlaceholdersAreUnique(self):
+        """Placeholder names of different recorders do not clash with each other or with real names"""
+
+        first = CommandRecorder()
+        second = CommandRecorder()
+        names = [first.glGenBuffers(1), second.glGenBuffers(1), first.glGenBuffers(1)]
+        self.assertEqual(len(set(names)), 3)
+        self.assertTrue(all(name < 0 for name in names))
+
+    def testSerializedPlaceholders(self):
+        """Deserialising a stream keeps new placeholders below the ones it contains"""
+
+        recorder = CommandRecorder()
+        name = recorder.glGenBuffers(1)
+        copy = CommandRecorder.deserialize(recorder.serialize())
+        self.assertTrue(copy.glGenBuffers(1) < name)
+
+
+if __name__ == '__main__':
+    unittest.main()
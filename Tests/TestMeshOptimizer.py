@@ -0,0 +1,71 @@
+"""The tests for reordering index buffers for the vertex cache, overdraw and vertex fetch
+
+Run from the repository root with: python -m unittest discover -s Tests -p "Test*.py"
+"""
+
+import unittest
+import numpy
+from Tools.MeshOptimizer import MeshOptimizer
+
+
+def grid(_size):
+    """A shuffled height-field of 2 * _size * _size triangles"""
+
+    y, x = numpy.mgrid[0:_size + 1, 0:_size + 1]
+    positions = numpy.stack([x.ravel(), y.ravel(), numpy.sin(0.3 * x.ravel())], axis=1)
+    first = numpy.arange(_size * (_size + 1)).reshape(_size, _size + 1)[:, :_size].ravel()
+    indices = numpy.concatenate([numpy.stack([first, first + 1, first + _size + 1], axis=1),
+                                 numpy.stack([first + 1, first + _size + 2, first + _size + 1], axis=1)])
+    indices = indices[numpy.random.RandomState(0).permutation(len(indices))]
+    return numpy.hstack([positions, positions]).astype(numpy.float32), indices
+
+
+class TestMeshOptimizer(unittest.TestCase):
+
+    def testTipsyMisses(self):
+        """The cache simulated while ordering matches simulating the new order"""
+
+        vertices, indices = grid(30)
+        order, misses = MeshOptimizer.tipsy(indices, len(vertices))
+        self.assertEqual(sorted(order.tolist()), list(range(len(indices))))
+        self.assertEqual(misses.tolist(), MeshOptimizer.cacheMisses(indices[order]).tolist())
+        self.assertEqual(MeshOptimizer.vertexCacheOrder(indices, len(vertices)).tolist(), order.tolist())
+
+        order, misses = MeshOptimizer.tipsy(numpy.zeros((0, 3), dtype=numpy.int64))
+        self.assertEqual((len(order), len(misses)), (0, 0))
+
+    def testOptimize(self):
+        """Optimising keeps the triangles and their winding and lowers the cache misses"""
+
+        vertices, indices = grid(30)
+        optimizer = MeshOptimizer(vertices, indices)
+        optimizer.optimize()
+
+        def triangles(_vertices, _indices):
+            corners = _vertices[_indices.astype(numpy.int64)].reshape(len(_indices), -1)
+            # Rotate each triangle to start at its smallest corner so the winding is kept
+            keys = [tuple(min(row[i:] + row[:i] for i in [0, 6, 12])) for row in corners.tolist()]
+            return sorted(keys)
+
+        self.assertEqual(triangles(optimizer.vertices, optimizer.indices), triangles(vertices, indices))
+        before = optimizer.before
+        after = optimizer.after
+        self.assertAlmostEqual(before[0], MeshOptimizer.statistics(indices)[0])
+        self.assertLess(after[0], 0.7)
+        self.assertLess(after[0], before[0])
+
+    def testLazyStatistics(self):
+        """The statistics are only measured when they are read"""
+
+        vertices, indices = grid(10)
+        optimizer = MeshOptimizer(vertices, indices)
+        optimizer.optimize()
+        self.assertIsNone(optimizer.m_before)
+        self.assertIsNone(optimizer.m_after)
+        self.assertIn('ACMR', optimizer.report())
+        self.assertIsNotNone(optimizer.m_before)
+        self.assertIsNotNone(optimizer.m_after)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+"""The tests for simplifying meshes with quadric error edge collapses and building levels of detail
+
+Run from the repository root with: python -m unittest discover -s Tests -p "Test*.py"
+"""
+
+import unittest
+import numpy
+from Benchmarks.MockGL import MockGL
+
+# The GL-facing modules must be imported after the mock is installed
+MockGL.install()
+
+from LOD import LOD
+from Primitives import Primitives
+from Tools.MeshSimplifier import MeshSimplifier
+
+
+def heightField(_size, _height):
+    """A height-field of 2 * _size * _size triangles facing up the z axis"""
+
+    y, x = numpy.mgrid[0:_size + 1, 0:_size + 1]
+    positions = numpy.stack([x.ravel(), y.ravel(), _height(x.ravel(), y.ravel())], axis=1).astype(numpy.float64)
+    first = numpy.arange(_size * (_size + 1)).reshape(_size, _size + 1)[:, :_size].ravel()
+    indices = numpy.concatenate([numpy.stack([first, first + 1, first + _size + 1], axis=1),
+                                 numpy.stack([first + 1, first + _size + 2, first + _size + 1], axis=1)])
+    return positions, indices
+
+
+def crossProducts(_positions, _indices):
+    p = _positions
+    f = _indices.astype(numpy.int64)
+    return numpy.cross(p[f[:, 1]] - p[f[:, 0]], p[f[:, 2]] - p[f[:, 0]])
+
+
+def area(_positions, _indices):
+    return 0.5 * numpy.linalg.norm(crossProducts(_positions, _indices), axis=1).sum()
+
+
+class TestMeshSimplifier(unittest.TestCase):
+
+    def setUp(self):
+        self.m_positions, self.m_indices = heightField(100, lambda x, y: numpy.sin(0.3 * x) * numpy.cos(0.2 * y))
+
+    def testFaceCount(self):
+        """Each level reaches its share of the triangles"""
+
+        ratios = [1.0, 0.5, 0.25, 0.125]
+        levels = MeshSimplifier(self.m_positions, self.m_indices).buildLevels(ratios)
+        for ratio, level in zip(ratios, levels):
+            self.assertLessEqual(len(level), numpy.ceil(ratio * len(self.m_indices)))
+            self.assertGreater(len(level), 0.9 * ratio * len(self.m_indices))
+
+    def testNoFlips(self):
+        """The simplified triangles of the height-field keep facing up"""
+
+        levels = MeshSimplifier(self.m_positions, self.m_indices).buildLevels([0.5, 0.25, 0.125, 0.01])
+        self.assertLess(len(levels[-1]), 0.05 * len(self.m_indices))
+        for level in levels:
+            normals = crossProducts(self.m_positions, level)
+            cosines = normals[:, 2] / numpy.linalg.norm(normals, axis=1)
+            self.assertGreater(cosines.min(), MeshSimplifier.s_flipThreshold)
+
+    def testBoundary(self):
+        """The outline of the height-field and the area of a flat grid are kept"""
+
+        size = 100
+        for level in MeshSimplifier(self.m_positions, self.m_indices).buildLevels([0.5, 0.125, 0.01]):
+            # The projected triangles still cover the square exactly once
+            self.assertAlmostEqual(0.5 * crossProducts(self.m_positions, level)[:, 2].sum(), size * size)
+
+        positions, indices = heightField(size, lambda x, y: numpy.zeros(len(x)))
+        for level in MeshSimplifier(positions, indices).buildLevels([0.5, 0.125, 0.01]):
+            self.assertAlmostEqual(area(positions, level), size * size)
+
+    def testErrorBound(self):
+        """The levels stop at the error bound and the following levels reuse them"""
+
+        levels = MeshSimplifier(self.m_positions, self.m_indices).buildLevels([1.0, 0.5, 0.25, 0.01], 1e-4)
+        default = MeshSimplifier(self.m_positions, self.m_indices).buildLevels([0.01])
+        self.assertGreater(len(levels[-1]), len(default[-1]))
+        self.assertIs(levels[-1], levels[-2])
+
+    def testCubeLOD(self):
+        """The faces of a cube are attribute seams, so every level keeps the whole cube"""
+
+        if 'cube' not in Primitives.s_meshes:
+            Primitives().createCube('cube')
+        vertices = Primitives.s_meshes['cube'][0]
+
+        welded, indices = MeshSimplifier.weld(vertices.ravel())
+        levels = MeshSimplifier(welded[:, :3], indices).buildLevels([1.0, 0.5, 0.25])
+        self.assertEqual([len(level) for level in levels], [12, 12, 12])
+        self.assertAlmostEqual(area(welded[:, :3].astype(numpy.float64), levels[-1]), 6.0, places=5)
+
+        lod = LOD(vertices.ravel())
+        self.assertEqual(lod.levels, [(0, 36)] * 4)
+        self.assertEqual(len(lod.m_thresholds), 3)
+
+    def testEmpty(self):
+        """A mesh without triangles simplifies to no triangles"""
+
+        welded, indices = MeshSimplifier.weld([])
+        self.assertEqual((len(welded), len(indices)), (0, 0))
+        levels = MeshSimplifier(welded[:, :3], indices).buildLevels([1.0, 0.5])
+        self.assertEqual([len(level) for level in levels], [0, 0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+"""The tests for culling bounding boxes behind occluders with the software depth pyramid
+
+Run from the repository root with: python -m unittest discover -s Tests -p "Test*.py"
+"""
+
+import unittest
+import numpy
+from Tools.OcclusionCuller import OcclusionCuller
+from Tools.VPMatrix import VPMatrix
+
+
+class TestOcclusionCuller(unittest.TestCase):
+
+    def setUp(self):
+        # A camera on the z axis looking at an 8x8 wall through the origin
+        self.m_vpMatrix = VPMatrix()
+        self.m_vpMatrix.createViewMatrix([0, 0, 10], [0, 0, 0], [0, 1, 0])
+        self.m_vpMatrix.createPerspectiveMatrix(60, 2.0, 0.1, 100)
+
+        self.m_culler = OcclusionCuller()
+        wall = numpy.array([[-4, -4, 0], [4, -4, 0], [4, 4, 0], [-4, 4, 0]], dtype=numpy.float64)
+        self.m_culler.addOccluder(wall, [[0, 1, 2], [0, 2, 3]])
+
+    def boxes(self):
+        return numpy.array([[[-0.5, -0.5, -5], [0.5, 0.5, -4]],
+                            [[-0.5, -0.5, 2], [0.5, 0.5, 3]],
+                            [[10, -0.5, -5], [11, 0.5, -4]],
+                            [[3.5, -0.5, -1], [5, 0.5, -0.5]],
+                            [[-0.5, -0.5, 9.99], [0.5, 0.5, 11]]])
+
+    def testWallMask(self):
+        """Only the box fully behind the wall is hidden"""
+
+        self.m_culler.render(self.m_vpMatrix)
+        # Behind the wall, in front of it, behind but beside it, behind its edge and crossing the near plane
+        expected = [False, True, True, True, True]
+        self.assertEqual(self.m_culler.test(self.boxes()).tolist(), expected)
+        self.m_culler.renderAsync(self.m_vpMatrix)
+        self.assertEqual(self.m_culler.test(self.boxes()).tolist(), expected)
+
+    def testWallMaskWithMatrices(self):
+        """Shared bounds placed by model matrices are hidden only behind the wall"""
+
+        self.m_culler.render(self.m_vpMatrix)
+        matrices = numpy.tile(numpy.identity(4), (2, 1, 1))
+        matrices[0, 3, :3] = [0, 0, 2]
+        matrices[1, 3, :3] = [0, 0, -5]
+        mask = self.m_culler.test([[-0.5, -0.5, -0.5], [0.5, 0.5, 0.5]], matrices)
+        self.assertEqual(mask.tolist(), [True, False])
+
+    def testNothingRendered(self):
+        """Every box is visible before the occluders are rendered or after they are removed"""
+
+        self.assertTrue(self.m_culler.test(self.boxes()).all())
+        self.m_culler.clearOccluders()
+        self.m_culler.render(self.m_vpMatrix)
+        self.assertTrue(self.m_culler.test(self.boxes()).all())
+
+
+if __name__ == '__main__':
+    unittest.main()
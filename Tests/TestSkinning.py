@@ -0,0 +1,165 @@
+"""The tests for sampling animation clips, computing skeleton palettes and skinning on the CPU
+
+Run from the repository root with: python -m unittest discover -s Tests -p "Test*.py"
+"""
+
+import unittest
+import numpy
+import pyrr
+from Benchmarks.MockGL import MockGL
+
+# The GL-facing modules must be imported after the mock is installed
+MockGL.install()
+
+from SkinnedMesh import SkinnedMesh
+from Tools.AnimationClip import AnimationClip
+from Tools.Skeleton import Skeleton
+
+
+def randomQuaternions(_random, _shape):
+    quaternions = _random.normal(size=_shape + (4,))
+    return quaternions / numpy.linalg.norm(quaternions, axis=-1)[..., None]
+
+
+def referenceMatrix(_translation, _rotation, _scale):
+    """Compose scale * rotation * translation with pyrr like Transformation.matrix"""
+
+    scale = pyrr.matrix44.create_from_scale(_scale)
+    rotation = pyrr.matrix44.create_from_quaternion(_rotation)
+    translation = pyrr.matrix44.create_from_translation(_translation)
+    return scale.dot(rotation).dot(translation)
+
+
+def referenceSkin(_palettes, _positions, _normals, _boneIndices, _weights):
+    """Skin every vertex of every instance one at a time"""
+
+    positions = numpy.empty((len(_palettes), len(_positions), 3))
+    normals = numpy.empty((len(_palettes), len(_positions), 3))
+    for n in range(len(_palettes)):
+        for v in range(len(_positions)):
+            matrix = numpy.zeros((4, 4))
+            for bone, weight in zip(_boneIndices[v], _weights[v]):
+                matrix += weight * _palettes[n, bone]
+            positions[n, v] = numpy.append(_positions[v], 1.0).dot(matrix)[:3]
+            normal = _normals[v].dot(matrix[:3, :3])
+            normals[n, v] = normal / numpy.linalg.norm(normal)
+
+    return positions, normals
+
+
+class TestSkinning(unittest.TestCase):
+
+    def setUp(self):
+        self.m_random = numpy.random.RandomState(0)
+        # A chain with a branch, with a child listed before its parent
+        self.m_parents = [-1, 0, 4, 1, 0]
+        self.m_skeleton = Skeleton(self.m_parents, self.randomMatrices((5,)))
+
+    def randomMatrices(self, _shape):
+        translations = self.m_random.uniform(-1.0, 1.0, _shape + (3,))
+        rotations = randomQuaternions(self.m_random, _shape)
+        scales = self.m_random.uniform(0.5, 1.5, _shape + (3,))
+        return AnimationClip.composeMatrices(translations, rotations, scales)
+
+    def testSlerp(self):
+        """slerp matches pyrr away from the linear interpolation fallbacks and takes the shortest path"""
+
+        q1 = randomQuaternions(self.m_random, (200,))
+        q2 = randomQuaternions(self.m_random, (200,))
+        t = self.m_random.uniform(0.0, 1.0, 200)
+        results = AnimationClip.slerp(q1, q2, t)
+
+        tested = 0
+        for a, b, factor, result in zip(q1, q2, t, results):
+            if abs(numpy.dot(a, b)) > 0.9:
+                continue
+            tested += 1
+            self.assertTrue(numpy.allclose(result, pyrr.quaternion.slerp(a, b, factor)))
+        self.assertGreater(tested, 100)
+
+        # The ends are the inputs, with the end flipped onto the same hemisphere as the start
+        self.assertTrue(numpy.allclose(AnimationClip.slerp(q1, q2, 0.0), q1))
+        flip = numpy.where(numpy.sum(q1 * q2, axis=-1) < 0.0, -1.0, 1.0)[:, None]
+        self.assertTrue(numpy.allclose(AnimationClip.slerp(q1, q2, 1.0), q2 * flip))
+
+    def testSample(self):
+        """Sampling between keyframes composes the interpolated transforms like pyrr"""
+
+        translations = self.m_random.uniform(-1.0, 1.0, (2, 3, 3))
+        rotations = randomQuaternions(self.m_random, (2, 3))
+        scales = self.m_random.uniform(0.5, 1.5, (2, 3, 3))
+        clip = AnimationClip([0.0, 2.0], translations, rotations, scales)
+
+        matrices = clip.sample([0.5, 2.0], _loop=False)
+        self.assertEqual(matrices.shape, (2, 3, 4, 4))
+        for bone in range(3):
+            translation = 0.75 * translations[0, bone] + 0.25 * translations[1, bone]
+            rotation = AnimationClip.slerp(rotations[0, bone], rotations[1, bone], 0.25)
+            scale = 0.75 * scales[0, bone] + 0.25 * scales[1, bone]
+            self.assertTrue(numpy.allclose(matrices[0, bone], referenceMatrix(translation, rotation, scale)))
+            self.assertTrue(numpy.allclose(matrices[1, bone], referenceMatrix(translations[1, bone],
+                                                                             rotations[1, bone],
+                                                                             scales[1, bone])))
+
+    def testPalettes(self):
+        """Each palette is the inverse bind matrix times the world matrix composed down the hierarchy"""
+
+        local = self.randomMatrices((3, 5))
+        palettes = self.m_skeleton.palettes(local)
+        self.assertEqual(palettes.shape, (3, 5, 4, 4))
+
+        inverseBind = self.m_skeleton.m_inverseBind
+        for n in range(3):
+            for bone in range(5):
+                world = numpy.identity(4)
+                current = bone
+                while current >= 0:
+                    world = world.dot(local[n, current])
+                    current = self.m_parents[current]
+                self.assertTrue(numpy.allclose(palettes[n, bone], inverseBind[bone].dot(world)))
+
+    def testSkin(self):
+        """Skinning in batches matches blending the matrices of each vertex"""
+
+        palettes = self.m_skeleton.palettes(self.randomMatrices((7, 5)))
+        positions = self.m_random.uniform(-1.0, 1.0, (40, 3))
+        normals = randomQuaternions(self.m_random, (40,))[:, :3]
+        boneIndices = self.m_random.randint(0, 5, (40, 3))
+        weights = self.m_random.uniform(0.1, 1.0, (40, 3))
+        weights /= weights.sum(axis=1)[:, None]
+        expected = referenceSkin(palettes, positions, normals, boneIndices, weights)
+
+        batchVertices = Skeleton.s_batchVertices
+        try:
+            # Split the instances into batches of 2 instances
+            Skeleton.s_batchVertices = 100
+            skinned = Skeleton.skin(palettes, positions, normals, boneIndices, weights)
+        finally:
+            Skeleton.s_batchVertices = batchVertices
+
+        for result, reference in zip(skinned, expected):
+            self.assertEqual(result.dtype, numpy.float32)
+            self.assertEqual(result.shape, (7, 40, 3))
+            self.assertTrue(numpy.allclose(result, reference, atol=1e-5))
+
+    def testSkinnedMesh(self):
+        """SkinnedMesh stores the skinned positions and normals of every instance of a clip"""
+
+        positions = self.m_random.uniform(-1.0, 1.0, (9, 3))
+        normals = randomQuaternions(self.m_random, (9,))[:, :3]
+        boneIndices = self.m_random.randint(0, 5, (9, 2))
+        weights = numpy.tile([0.25, 0.75], (9, 1))
+        mesh = SkinnedMesh(self.m_skeleton, positions, normals, boneIndices, weights, _numInstances=2)
+
+        clip = AnimationClip([0.0, 1.0], self.m_random.uniform(-1.0, 1.0, (2, 5, 3)),
+                             randomQuaternions(self.m_random, (2, 5)))
+        mesh.animate(clip, [0.25, 0.5])
+
+        palettes = self.m_skeleton.palettes(clip.sample([0.25, 0.5]))
+        expectedPositions, expectedNormals = referenceSkin(palettes, positions, normals, boneIndices, weights)
+        self.assertTrue(numpy.allclose(mesh.vertices[..., :3], expectedPositions, atol=1e-5))
+        self.assertTrue(numpy.allclose(mesh.vertices[..., 3:], expectedNormals, atol=1e-5))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+"""The tests for batching static primitive instances into chunks
+
+Run from the repository root with: python -m unittest discover -s Tests -p "Test*.py"
+"""
+
+import unittest
+import numpy
+import pyrr
+from Benchmarks.MockGL import MockGL
+
+# The GL-facing modules must be imported after the mock is installed
+s_gl = MockGL.install()
+
+from Primitives import Primitives
+from ShaderStore import ShaderStore
+from StaticBatch import StaticBatch
+
+
+def translation(_x, _y, _z):
+    matrix = numpy.identity(4)
+    matrix[3, :3] = [_x, _y, _z]
+    return matrix
+
+
+class TestStaticBatch(unittest.TestCase):
+
+    def setUp(self):
+        if 'cube' not in Primitives.s_meshes:
+            Primitives().createCube('cube')
+
+        # Two materials give two chunks
+        self.m_batch = StaticBatch()
+        self.m_ids = [self.m_batch.add('cube', translation(i, 0, 0), 'a' if i % 2 else 'b') for i in range(6)]
+        self.assertEqual(self.m_batch.build(), 2)
+
+    def testSetModelMatrix(self):
+        """Moving an instance re-uploads only its chunk into the existing buffer"""
+
+        vaos = [chunk['vao'] for chunk in self.m_batch.chunks]
+        self.assertTrue(self.m_batch.setModelMatrix(self.m_ids[1], translation(0, 5, 0)))
+        self.assertEqual([chunk['dirty'] for chunk in self.m_batch.chunks], [False, True])
+
+        s_gl.reset()
+        self.assertEqual(self.m_batch.build(), 1)
+        calls = s_gl.calls
+        self.assertEqual(calls.get('glBufferSubData'), 1)
+        self.assertNotIn('glGenVertexArrays', calls)
+        self.assertNotIn('glGenBuffers', calls)
+        self.assertNotIn('glBufferData', calls)
+        self.assertEqual([chunk['vao'] for chunk in self.m_batch.chunks], vaos)
+
+        self.assertFalse(self.m_batch.setModelMatrix(-1, translation(0, 0, 0)))
+
+    def testRemove(self):
+        """Removing an instance rebuilds its chunk with a new layout and deletes the old VAO"""
+
+        chunk = self.m_batch.chunks[1]
+        vao = chunk['vao']
+        self.assertTrue(self.m_batch.remove(self.m_ids[1]))
+        self.assertFalse(self.m_batch.remove(self.m_ids[1]))
+        self.assertTrue(chunk['dirty'] and chunk['resized'])
+
+        s_gl.reset()
+        self.assertEqual(self.m_batch.build(), 1)
+        self.assertIsNot(chunk['vao'], vao)
+        self.assertIsNone(vao.m_vao)
+        self.assertEqual(s_gl.calls.get('glDeleteVertexArrays'), 1)
+        self.assertEqual(chunk['vao'].numVertices, 2 * len(Primitives.s_meshes['cube'][0]))
+        self.assertEqual(self.m_batch.numInstances, 5)
+
+        # Removing the last instances of a chunk drops its VAO
+        for i in [3, 5]:
+            self.m_batch.remove(self.m_ids[i])
+        self.m_batch.build()
+        self.assertIsNone(chunk['vao'])
+
+    def testDraw(self):
+        """Each chunk is drawn with one call from its element buffer"""
+
+        ShaderStore.m_shaders['a'] = 1
+        ShaderStore.m_shaders['b'] = 2
+        s_gl.reset()
+        self.assertEqual(self.m_batch.draw(), 2)
+        self.assertEqual(s_gl.calls.get('glDrawElements'), 2)
+        self.assertNotIn('glDrawArrays', s_gl.calls)
+
+    def testTransform(self):
+        """Transformed positions and normals match transforming each source vertex"""
+
+        vertices = Primitives.s_meshes['cube'][0]
+        scale = numpy.diag([2.0, 1.0, 0.5, 1.0])
+        matrices = numpy.array([translation(1, 2, 3),
+                                scale.dot(numpy.array(pyrr.matrix44.create_from_y_rotation(0.7))).dot(
+                                    translation(-1, 0, 4))])
+        transformed = StaticBatch.transform(vertices, matrices)
+        self.assertEqual(transformed.shape, (2, len(vertices), 6))
+
+        for matrix, result in zip(matrices, transformed):
+            normalMatrix = numpy.linalg.inv(matrix[:3, :3]).T
+            for vertex, output in zip(vertices.astype(numpy.float64), result):
+                position = numpy.append(vertex[:3], 1.0).dot(matrix)[:3]
+                normal = vertex[3:].dot(normalMatrix)
+                normal /= numpy.linalg.norm(normal)
+                self.assertTrue(numpy.allclose(output[:3], position, atol=1e-5))
+                self.assertTrue(numpy.allclose(output[3:], normal, atol=1e-5))
+
+            # The normals stay perpendicular to the transformed triangles
+            triangles = result[:, :3].reshape(-1, 3, 3)
+            normals = result[::3, 3:]
+            for edge in [triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0]]:
+                self.assertLess(numpy.abs((normals * edge).sum(axis=1)).max(), 1e-5)
+
+
+if __name__ == '__main__':
+    unittest.main()
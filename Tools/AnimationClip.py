@@ -0,0 +1,141 @@
+import numpy
+
+
+class AnimationClip(object):
+    """This class stores the keyframe tracks of every bone of a skeleton and samples them in batches
+
+    All tracks share the keyframe times. Rotations are quaternions stored as [x, y, z, w] like pyrr.
+    """
+
+    def __init__(self, _times, _translations, _rotations, _scales=None):
+        """The constructor
+
+        Args:
+            _times: The keyframe times in seconds in increasing order, with shape (k,)
+            _translations: The translation of each bone at each keyframe, with shape (k, b, 3)
+            _rotations: The rotation quaternion of each bone at each keyframe, with shape (k, b, 4)
+            _scales: The scale of each bone at each keyframe, with shape (k, b, 3), or None for no scaling
+        """
+
+        self.m_times = numpy.asarray(_times, dtype=numpy.float64)
+        self.m_translations = numpy.asarray(_translations, dtype=numpy.float64)
+        self.m_rotations = AnimationClip.normalize(numpy.asarray(_rotations, dtype=numpy.float64))
+        if _scales is None:
+            self.m_scales = numpy.ones_like(self.m_translations)
+        else:
+            self.m_scales = numpy.asarray(_scales, dtype=numpy.float64)
+
+    @property
+    def duration(self):
+        return self.m_times[-1]
+
+    @property
+    def numBones(self):
+        return self.m_translations.shape[1]
+
+    @staticmethod
+    def normalize(_quaternions):
+        """Normalise an array of quaternions
+
+        Args:
+            _quaternions: The quaternions with shape (..., 4)
+
+        Returns:
+            The normalised quaternions
+        """
+
+        return _quaternions / numpy.linalg.norm(_quaternions, axis=-1)[..., None]
+
+    @staticmethod
+    def slerp(_q1, _q2, _t):
+        """Spherically interpolate between arrays of quaternions
+
+        Args:
+            _q1: The start quaternions with shape (..., 4)
+            _q2: The end quaternions with shape (..., 4)
+            _t: The interpolation factors, broadcastable to shape (...)
+
+        Returns:
+            The interpolated quaternions with shape (..., 4)
+        """
+
+        t = numpy.asarray(_t, dtype=numpy.float64)[..., None]
+        cosTheta = numpy.sum(_q1 * _q2, axis=-1)[..., None]
+
+        # Take the shortest path
+        q2 = numpy.where(cosTheta < 0.0, -_q2, _q2)
+        cosTheta = numpy.abs(cosTheta)
+
+        # Fall back to linear interpolation when the quaternions are almost the same
+        theta = numpy.arccos(numpy.minimum(cosTheta, 1.0))
+        sinTheta = numpy.sin(theta)
+        small = sinTheta < 1e-6
+        safeSin = numpy.where(small, 1.0, sinTheta)
+        w1 = numpy.where(small, 1.0 - t, numpy.sin((1.0 - t) * theta) / safeSin)
+        w2 = numpy.where(small, t, numpy.sin(t * theta) / safeSin)
+
+        return AnimationClip.normalize(w1 * _q1 + w2 * q2)
+
+    @staticmethod
+    def composeMatrices(_translations, _rotations, _scales):
+        """Build scale * rotation * translation matrices like Transformation.matrix
+
+        Args:
+            _translations: The translations with shape (..., 3)
+            _rotations: The unit quaternions with shape (..., 4)
+            _scales: The scales with shape (..., 3)
+
+        Returns:
+            The matrices with shape (..., 4, 4), which multiply row vectors
+        """
+
+        x, y, z, w = numpy.moveaxis(_rotations, -1, 0)
+        matrices = numpy.zeros(_rotations.shape[:-1] + (4, 4))
+
+        # The same rotation matrix as pyrr.matrix44.create_from_quaternion
+        matrices[..., 0, 0] = 1.0 - 2.0 * (y * y + z * z)
+        matrices[..., 0, 1] = 2.0 * (x * y - z * w)
+        matrices[..., 0, 2] = 2.0 * (x * z + y * w)
+        matrices[..., 1, 0] = 2.0 * (x * y + z * w)
+        matrices[..., 1, 1] = 1.0 - 2.0 * (x * x + z * z)
+        matrices[..., 1, 2] = 2.0 * (y * z - x * w)
+        matrices[..., 2, 0] = 2.0 * (x * z - y * w)
+        matrices[..., 2, 1] = 2.0 * (y * z + x * w)
+        matrices[..., 2, 2] = 1.0 - 2.0 * (x * x + y * y)
+
+        # Scaling first scales the rows of the rotation
+        matrices[..., :3, :3] *= _scales[..., :, None]
+        matrices[..., 3, :3] = _translations
+        matrices[..., 3, 3] = 1.0
+
+        return matrices
+
+    def sample(self, _times, _loop=True):
+        """Sample every bone of many instances of the clip
+
+        Args:
+            _times: The time of each instance in seconds, with shape (n,)
+            _loop: Whether the times wrap around the duration or are clamped to it
+
+        Returns:
+            The local matrices of the bones with shape (n, b, 4, 4)
+        """
+
+        times = numpy.atleast_1d(numpy.asarray(_times, dtype=numpy.float64))
+        if _loop and self.duration > self.m_times[0]:
+            times = self.m_times[0] + numpy.mod(times - self.m_times[0], self.duration - self.m_times[0])
+        times = numpy.clip(times, self.m_times[0], self.m_times[-1])
+
+        # Find the keyframes on either side of each time
+        after = numpy.clip(numpy.searchsorted(self.m_times, times, side='right'), 1, len(self.m_times) - 1)
+        before = after - 1
+        span = self.m_times[after] - self.m_times[before]
+        t = numpy.where(span > 0.0, (times - self.m_times[before]) / numpy.where(span > 0.0, span, 1.0), 0.0)
+        t = numpy.clip(t, 0.0, 1.0)[:, None]
+
+        translations = self.m_translations[before] + t[..., None] * (self.m_translations[after] -
+                                                                     self.m_translations[before])
+        scales = self.m_scales[before] + t[..., None] * (self.m_scales[after] - self.m_scales[before])
+        rotations = AnimationClip.slerp(self.m_rotations[before], self.m_rotations[after], t)
+
+        return AnimationClip.composeMatrices(translations, rotations, scales)
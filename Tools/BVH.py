@@ -0,0 +1,344 @@
+import numpy
+
+
+class BVH(object):
+    """This class is a bounding volume hierarchy over the world space bounds of many objects
+
+    The objects are sorted along a Morton curve and grouped into leaves, which form a complete binary tree.
+    The nodes are stored in flat NumPy arrays in heap order, so the children of node i are 2i + 1 and 2i + 2,
+    and every node covers a contiguous range of the sorted objects. Queries start from all the nodes of a level
+    near the top and traverse the tree s_levelStep levels at a time, testing all the nodes of a level together.
+    """
+
+    # The deepest level queries start at, which tests the top of the tree in one step
+    s_startLevel = 8
+    # The number of levels queries descend at once, testing the descendants of a node without its children
+    s_levelStep = 3
+    # The centre of empty nodes for the frustum test, which is outside every bounded frustum
+    s_emptyCenter = -1e300
+
+    def __init__(self, _bounds, _matrices=None, _leafSize=8):
+        """The constructor
+
+        Args:
+            _bounds: The local bounding boxes as an array of shape (k, 2, 3), or (2, 3) if all objects share them
+            _matrices: The model matrices as an array of shape (k, 4, 4), or None if the bounds are in world space
+            _leafSize: The maximum number of objects in a leaf
+        """
+
+        self.m_leafSize = _leafSize
+        # The local bounds of each object, as the minimum and maximum corners
+        self.m_localBounds = numpy.asarray(_bounds, dtype=numpy.float64)
+        if _matrices is not None:
+            numObjects = len(numpy.asarray(_matrices).reshape(-1, 16))
+        else:
+            numObjects = len(self.m_localBounds.reshape(-1, 6))
+        if self.m_localBounds.ndim == 2:
+            self.m_localBounds = numpy.repeat(self.m_localBounds[None], numObjects, axis=0)
+        else:
+            self.m_localBounds = self.m_localBounds.reshape(-1, 2, 3)
+
+        # The world space bounds of each object
+        if _matrices is None:
+            self.m_bounds = self.m_localBounds.copy()
+        else:
+            self.m_bounds = BVH.transformBounds(self.m_localBounds, _matrices)
+
+        self.rebuild()
+
+    @staticmethod
+    def transformBounds(_bounds, _matrices):
+        """Transform bounding boxes by model matrices
+
+        Args:
+            _bounds: The bounding boxes as an array of shape (k, 2, 3)
+            _matrices: The model matrices as an array of shape (k, 4, 4), which multiply row vectors
+
+        Returns:
+            The bounding boxes of the transformed boxes as an array of shape (k, 2, 3)
+        """
+
+        matrices = numpy.asarray(_matrices, dtype=numpy.float64).reshape(-1, 4, 4)
+        center = 0.5 * (_bounds[:, 0] + _bounds[:, 1])
+        extent = 0.5 * (_bounds[:, 1] - _bounds[:, 0])
+
+        center = numpy.einsum('kj,kjl->kl', center, matrices[:, :3, :3]) + matrices[:, 3, :3]
+        extent = numpy.einsum('kj,kjl->kl', extent, numpy.abs(matrices[:, :3, :3]))
+
+        return numpy.stack([center - extent, center + extent], axis=1)
+
+    @staticmethod
+    def mortonCodes(_points):
+        """Compute 30 bit Morton codes of points normalised to their bounding box
+
+        Args:
+            _points: The points as an array of shape (k, 3)
+
+        Returns:
+            The Morton codes as an array of shape (k,)
+        """
+
+        if len(_points) == 0:
+            return numpy.zeros(0, dtype=numpy.int64)
+
+        low = _points.min(axis=0)
+        size = numpy.maximum(_points.max(axis=0) - low, 1e-12)
+        cells = numpy.clip(((_points - low) / size * 1024.0).astype(numpy.int64), 0, 1023)
+
+        # Spread the 10 bits of each coordinate so there are two zero bits between each bit
+        cells = (cells | (cells << 16)) & 0x030000FF
+        cells = (cells | (cells << 8)) & 0x0300F00F
+        cells = (cells | (cells << 4)) & 0x030C30C3
+        cells = (cells | (cells << 2)) & 0x09249249
+
+        return (cells[:, 0] << 2) | (cells[:, 1] << 1) | cells[:, 2]
+
+    @property
+    def numObjects(self):
+        return len(self.m_bounds)
+
+    @property
+    def numNodes(self):
+        return len(self.m_nodeMin)
+
+    @property
+    def bounds(self):
+        """Get the world space bounds of the objects
+
+        Returns:
+            An array of shape (k, 2, 3)
+        """
+
+        return self.m_bounds
+
+    def rebuild(self):
+        """Sort the objects along the Morton curve and rebuild the tree"""
+
+        numObjects = len(self.m_bounds)
+        centers = 0.5 * (self.m_bounds[:, 0] + self.m_bounds[:, 1])
+
+        # The objects in Morton order, and the position of each object in that order
+        self.m_order = numpy.argsort(BVH.mortonCodes(centers), kind='stable')
+        self.m_position = numpy.empty(numObjects, dtype=numpy.int64)
+        self.m_position[self.m_order] = numpy.arange(numObjects)
+
+        # Use a power of 2 leaves so the tree is complete
+        numLeaves = 1
+        while numLeaves * self.m_leafSize < numObjects:
+            numLeaves *= 2
+        self.m_numLeaves = numLeaves
+
+        # The range of sorted objects covered by each node
+        numNodes = 2 * numLeaves - 1
+        nodes = numpy.arange(numNodes)
+        level = numpy.floor(numpy.log2(nodes + 1)).astype(numpy.int64)
+        span = numLeaves >> level
+        firstLeaf = (nodes + 1 - (1 << level)) * span
+        self.m_first = numpy.minimum(firstLeaf * self.m_leafSize, numObjects)
+        self.m_last = numpy.minimum((firstLeaf + span) * self.m_leafSize, numObjects)
+
+        self.m_nodeMin = numpy.empty((numNodes, 3))
+        self.m_nodeMax = numpy.empty((numNodes, 3))
+        # The centre and half extent of the nodes and of the objects in sorted order in one row for the
+        # frustum test
+        self.m_nodeBoxes = numpy.empty((numNodes, 6))
+        self.m_sortedBoxes = numpy.empty((numObjects, 6))
+        self.refitLeaves(numpy.arange(numLeaves))
+
+    def refitLeaves(self, _leaves):
+        """Recompute the bounds of some leaves and their ancestors
+
+        Args:
+            _leaves: The indices of the leaves, counted from the first leaf
+        """
+
+        leafNodes = numpy.unique(_leaves) + self.m_numLeaves - 1
+        if len(leafNodes) == 0:
+            return
+
+        lengths = self.m_last[leafNodes] - self.m_first[leafNodes]
+        empty = lengths == 0
+
+        # Reduce the bounds of the objects in each leaf, which are contiguous after gathering them
+        positions = self.sortedRanges(leafNodes)
+        bounds = self.m_bounds[self.m_order[positions]]
+        self.m_sortedBoxes[positions, :3] = 0.5 * (bounds[:, 0] + bounds[:, 1])
+        self.m_sortedBoxes[positions, 3:] = 0.5 * (bounds[:, 1] - bounds[:, 0])
+        starts = (numpy.cumsum(lengths) - lengths)[~empty]
+        if len(starts) > 0:
+            self.m_nodeMin[leafNodes[~empty]] = numpy.minimum.reduceat(bounds[:, 0], starts, axis=0)
+            self.m_nodeMax[leafNodes[~empty]] = numpy.maximum.reduceat(bounds[:, 1], starts, axis=0)
+        self.m_nodeMin[leafNodes[empty]] = numpy.inf
+        self.m_nodeMax[leafNodes[empty]] = -numpy.inf
+
+        # Propagate the bounds up the tree one level at a time
+        nodes = leafNodes
+        changed = [nodes]
+        while nodes[0] > 0:
+            nodes = numpy.unique((nodes - 1) // 2)
+            self.m_nodeMin[nodes] = numpy.minimum(self.m_nodeMin[2 * nodes + 1], self.m_nodeMin[2 * nodes + 2])
+            self.m_nodeMax[nodes] = numpy.maximum(self.m_nodeMax[2 * nodes + 1], self.m_nodeMax[2 * nodes + 2])
+            changed.append(nodes)
+
+        # Empty nodes have infinite bounds, so they are given a point far outside the frustum instead
+        changed = numpy.concatenate(changed)
+        nodeMin = self.m_nodeMin[changed]
+        nodeMax = self.m_nodeMax[changed]
+        empty = nodeMin[:, 0] > nodeMax[:, 0]
+        nodeMin[empty] = BVH.s_emptyCenter
+        nodeMax[empty] = BVH.s_emptyCenter
+        self.m_nodeBoxes[changed, :3] = 0.5 * (nodeMin + nodeMax)
+        self.m_nodeBoxes[changed, 3:] = 0.5 * (nodeMax - nodeMin)
+
+    def refit(self, _matrices, _indices=None):
+        """Update the bounds of objects that have moved without changing the structure of the tree
+
+        Args:
+            _matrices: The new model matrices of the moved objects
+            _indices: The indices of the moved objects, or None if all objects have moved
+        """
+
+        if _indices is None:
+            indices = numpy.arange(len(self.m_bounds))
+        else:
+            indices = numpy.asarray(_indices, dtype=numpy.int64).reshape(-1)
+
+        self.m_bounds[indices] = BVH.transformBounds(self.m_localBounds[indices], _matrices)
+        self.refitLeaves(self.m_position[indices] // self.m_leafSize)
+
+    def sortedRanges(self, _nodes):
+        """Get the sorted positions of all the objects covered by some nodes
+
+        Args:
+            _nodes: The node indices
+
+        Returns:
+            The positions in the sorted order as a single array
+        """
+
+        first = self.m_first[_nodes]
+        lengths = self.m_last[_nodes] - first
+        offsets = numpy.cumsum(lengths) - lengths
+        return numpy.arange(lengths.sum()) - numpy.repeat(offsets - first, lengths)
+
+    @property
+    def depth(self):
+        return self.m_numLeaves.bit_length() - 1
+
+    def startNodes(self):
+        """Get the nodes queries start from
+
+        Returns:
+            A tuple of the indices of the nodes of the level s_startLevel, or of the leaves if the tree is not
+            that deep, and the level
+        """
+
+        level = min(BVH.s_startLevel, self.depth)
+        return numpy.arange((1 << level) - 1, (2 << level) - 1), level
+
+    def descendants(self, _nodes, _level):
+        """Get the descendants of some nodes s_levelStep levels down, or at the leaves if they are closer
+
+        Args:
+            _nodes: The indices of the nodes, which are all at the same level
+            _level: The level of the nodes
+
+        Returns:
+            A tuple of the indices of the descendants and their level
+        """
+
+        step = min(BVH.s_levelStep, self.depth - _level)
+        first = ((_nodes + 1) << step) - 1
+        return (first[:, None] + numpy.arange(1 << step)).ravel(), _level + step
+
+    def frustumQuery(self, _vpMatrix):
+        """Find the objects that are inside or intersect the view frustum
+
+        Args:
+            _vpMatrix: A VPMatrix or Camera providing the frustum planes
+
+        Returns:
+            The indices of the visible objects in the Morton order of the tree, which is not sorted
+        """
+
+        planes = numpy.asarray(_vpMatrix.frustumPlanes, dtype=numpy.float64)
+
+        # Multiplying a centre and half extent by the rows gives the distance of the nearest and then the
+        # furthest point of the box to each plane, so the planes are tested along the first axis
+        matrix = numpy.empty((12, 6))
+        matrix[:, :3] = numpy.tile(planes[:, :3], (2, 1))
+        matrix[:6, 3:] = -numpy.abs(planes[:, :3])
+        matrix[6:, 3:] = numpy.abs(planes[:, :3])
+        offsets = numpy.tile(planes[:, 3], 2)[:, None]
+
+        def classify(_boxes, _indices):
+            distance = matrix.dot(_boxes.take(_indices, axis=0).T)
+            distance += offsets
+            outside = (distance[6:] < 0.0).any(axis=0)
+            inside = (distance[:6] >= 0.0).all(axis=0)
+            return outside, inside
+
+        visible = []
+        frontier, level = self.startNodes()
+        while len(frontier) > 0:
+            outside, inside = classify(self.m_nodeBoxes, frontier)
+            # Accept every object of the nodes that are completely inside
+            visible.append(self.sortedRanges(frontier[inside]))
+            partial = frontier[~outside & ~inside]
+            if level < self.depth:
+                frontier, level = self.descendants(partial, level)
+            else:
+                # Test the objects of the leaves that intersect the frustum individually
+                candidates = self.sortedRanges(partial)
+                outside, _ = classify(self.m_sortedBoxes, candidates)
+                visible.append(candidates[~outside])
+                frontier = partial[:0]
+
+        return self.m_order[numpy.concatenate(visible)]
+
+    def rayCast(self, _origin, _direction):
+        """Find the nearest object whose bounds are hit by a ray
+
+        Args:
+            _origin: The origin of the ray
+            _direction: The direction of the ray
+
+        Returns:
+            A tuple of the object index and the distance along the ray to its bounds
+            None if no object is hit
+        """
+
+        origin = numpy.asarray(_origin, dtype=numpy.float64)
+        with numpy.errstate(divide='ignore'):
+            inverse = 1.0 / numpy.asarray(_direction, dtype=numpy.float64)
+
+        def slabs(_min, _max):
+            with numpy.errstate(invalid='ignore'):
+                t0 = (_min - origin) * inverse
+                t1 = (_max - origin) * inverse
+            # A zero direction component with the origin on the slab gives NaN, which is inside the slab
+            t0 = numpy.where(numpy.isnan(t0), -numpy.inf, t0)
+            t1 = numpy.where(numpy.isnan(t1), numpy.inf, t1)
+            tNear = numpy.maximum(numpy.minimum(t0, t1).max(axis=1), 0.0)
+            tFar = numpy.maximum(t0, t1).min(axis=1)
+            return tNear, (tNear <= tFar) & (_min <= _max).all(axis=1)
+
+        frontier, level = self.startNodes()
+        while len(frontier) > 0 and level < self.depth:
+            _, hit = slabs(self.m_nodeMin[frontier], self.m_nodeMax[frontier])
+            frontier, level = self.descendants(frontier[hit], level)
+
+        if len(frontier) > 0:
+            _, hit = slabs(self.m_nodeMin[frontier], self.m_nodeMax[frontier])
+            frontier = frontier[hit]
+        if len(frontier) == 0:
+            return None
+
+        candidates = self.m_order[self.sortedRanges(frontier)]
+        distance, hit = slabs(self.m_bounds[candidates, 0], self.m_bounds[candidates, 1])
+        if not hit.any():
+            return None
+
+        distance = numpy.where(hit, distance, numpy.inf)
+        nearest = numpy.argmin(distance)
+        return int(candidates[nearest]), float(distance[nearest])
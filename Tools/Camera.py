@@ -1,4 +1,5 @@
 import math
+import numpy
 import pyrr
 from VPMatrix import VPMatrix
 
@@ -59,6 +60,35 @@ class Camera(object):
     def openGL(self):
         return self.m_vpMatrix.openGL
 
+    @property
+    def frustumPlanes(self):
+        return self.m_vpMatrix.frustumPlanes
+
+    def screenRay(self, _x, _y, _width, _height):
+        """Create a ray through a point on the screen
+
+        Args:
+            _x: The x coordinate in pixels from the left of the screen
+            _y: The y coordinate in pixels from the top of the screen
+            _width: The width of the screen in pixels
+            _height: The height of the screen in pixels
+
+        Returns:
+            A tuple of the ray origin on the near plane and the normalised ray direction
+        """
+
+        ndcX = 2.0 * _x / _width - 1.0
+        ndcY = 1.0 - 2.0 * _y / _height
+
+        # Unproject the points on the near and far planes, the matrix multiplies row vectors
+        inverse = numpy.linalg.inv(numpy.array(self.m_vpMatrix.matrix))
+        near = numpy.array([ndcX, ndcY, -1.0, 1.0]).dot(inverse)
+        far = numpy.array([ndcX, ndcY, 1.0, 1.0]).dot(inverse)
+        near = near[:3] / near[3]
+        far = far[:3] / far[3]
+
+        return near, pyrr.vector3.normalize(far - near)
+
     def calculateLocal(self):
         """Calculate the local coordinate frame"""
 
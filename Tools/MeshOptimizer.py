@@ -0,0 +1,343 @@
+import numpy
+from MeshSimplifier import MeshSimplifier
+
+
+class MeshOptimizer(object):
+    """This class reorders an indexed mesh for the post-transform vertex cache, overdraw and vertex fetch
+
+    The triangles are ordered with Tipsy (Sander et al., Fast Triangle Reordering for Vertex Locality and
+    Reduced Overdraw, 2007), which runs in linear time. The cache optimised order is split into clusters that
+    are sorted so triangles facing outwards are drawn first, and the vertices are then sorted into the order
+    they are first used. The cache is measured with the average cache miss ratio (ACMR), the misses per
+    triangle, and the average transformed vertex ratio (ATVR), the misses per vertex, where 1 is optimal.
+    """
+
+    # The size of the simulated FIFO post-transform cache
+    s_cacheSize = 16
+
+    def __init__(self, _vertices, _indices=None, _stride=6):
+        """The constructor
+
+        Args:
+            _vertices: The interleaved vertex data, with the position as the first 3 values of each vertex
+            _indices: The triangle indices, or None if every 3 vertices form a triangle
+            _stride: The number of floats per vertex
+        """
+
+        if _indices is None:
+            self.m_vertices, self.m_indices = MeshSimplifier.weld(_vertices, _stride)
+        else:
+            self.m_vertices = numpy.asarray(_vertices, dtype=numpy.float32).reshape(-1, _stride)
+            self.m_indices = numpy.asarray(_indices, dtype=numpy.int64).reshape(-1, 3)
+
+        # The statistics simulate the cache over every triangle, so they are only measured when asked for,
+        # and the given indices are kept to measure them after optimising
+        self.m_inputIndices = self.m_indices
+        self.m_numInputVertices = len(self.m_vertices)
+        self.m_cacheSize = None
+        self.m_before = None
+        self.m_after = None
+
+    @property
+    def vertices(self):
+        return self.m_vertices
+
+    @property
+    def indices(self):
+        return self.m_indices.astype(numpy.uint32)
+
+    @property
+    def before(self):
+        """Get the cache statistics of the mesh as it was given
+
+        Returns:
+            A tuple of the ACMR and ATVR
+        """
+
+        if self.m_before is None:
+            self.m_before = MeshOptimizer.statistics(self.m_inputIndices, self.m_numInputVertices, self.m_cacheSize)
+        return self.m_before
+
+    @property
+    def after(self):
+        """Get the cache statistics of the mesh after the last optimisation
+
+        Returns:
+            A tuple of the ACMR and ATVR
+        """
+
+        if self.m_after is None:
+            self.m_after = MeshOptimizer.statistics(self.m_indices, len(self.m_vertices), self.m_cacheSize)
+        return self.m_after
+
+    @staticmethod
+    def cacheMisses(_indices, _cacheSize=None):
+        """Simulate a FIFO post-transform vertex cache
+
+        Args:
+            _indices: The triangle indices with shape (t, 3)
+            _cacheSize: The number of vertices in the cache, or None to use s_cacheSize
+
+        Returns:
+            The number of cache misses of each triangle
+        """
+
+        cacheSize = _cacheSize or MeshOptimizer.s_cacheSize
+        corners = numpy.asarray(_indices, dtype=numpy.int64).ravel()
+        if len(corners) == 0:
+            return numpy.zeros(0, dtype=numpy.int64)
+
+        # A vertex is in the cache if fewer than cacheSize vertices were added since it was added
+        cacheTime = [0] * (int(corners.max()) + 1)
+        time = cacheSize + 1
+        missed = bytearray(len(corners))
+        for i, v in enumerate(corners.tolist()):
+            if time - cacheTime[v] > cacheSize:
+                cacheTime[v] = time
+                time += 1
+                missed[i] = 1
+
+        return numpy.frombuffer(bytes(missed), dtype=numpy.uint8).reshape(-1, 3).sum(axis=1, dtype=numpy.int64)
+
+    @staticmethod
+    def statistics(_indices, _numVertices=None, _cacheSize=None):
+        """Measure how well an index buffer uses the vertex cache
+
+        Args:
+            _indices: The triangle indices with shape (t, 3)
+            _numVertices: The number of vertices, or None to count the referenced vertices
+            _cacheSize: The number of vertices in the cache, or None to use s_cacheSize
+
+        Returns:
+            A tuple of the ACMR and ATVR
+        """
+
+        indices = numpy.asarray(_indices).reshape(-1, 3)
+        if len(indices) == 0:
+            return 0.0, 0.0
+
+        numVertices = _numVertices
+        if numVertices is None:
+            numVertices = len(numpy.unique(indices))
+
+        misses = float(MeshOptimizer.cacheMisses(indices, _cacheSize).sum())
+        return misses / len(indices), misses / max(numVertices, 1)
+
+    @staticmethod
+    def vertexCacheOrder(_indices, _numVertices=None, _cacheSize=None):
+        """Order triangles for the vertex cache with Tipsy
+
+        Args:
+            _indices: The triangle indices with shape (t, 3)
+            _numVertices: The number of vertices, or None to use the largest index
+            _cacheSize: The number of vertices in the cache, or None to use s_cacheSize
+
+        Returns:
+            The new order of the triangles
+        """
+
+        return MeshOptimizer.tipsy(_indices, _numVertices, _cacheSize)[0]
+
+    @staticmethod
+    def tipsy(_indices, _numVertices=None, _cacheSize=None):
+        """Order triangles for the vertex cache with Tipsy, simulating the FIFO cache like cacheMisses
+
+        Args:
+            _indices: The triangle indices with shape (t, 3)
+            _numVertices: The number of vertices, or None to use the largest index
+            _cacheSize: The number of vertices in the cache, or None to use s_cacheSize
+
+        Returns:
+            A tuple of the new order of the triangles and the number of cache misses of each triangle in that
+            order
+        """
+
+        cacheSize = _cacheSize or MeshOptimizer.s_cacheSize
+        corners = numpy.asarray(_indices, dtype=numpy.int64).ravel()
+        numTriangles = len(corners) // 3
+        numVertices = _numVertices
+        if numVertices is None:
+            numVertices = int(corners.max()) + 1 if numTriangles else 0
+        if numTriangles == 0:
+            return numpy.zeros(0, dtype=numpy.int64), numpy.zeros(0, dtype=numpy.int64)
+
+        # The valence of each vertex and the triangles using it, grouped by vertex in any order
+        counts = numpy.bincount(corners, minlength=numVertices)
+        starts = numpy.zeros(numVertices + 1, dtype=numpy.int64)
+        numpy.cumsum(counts, out=starts[1:])
+        adjacency = (numpy.argsort(corners) // 3).tolist()
+        starts = starts.tolist()
+
+        corners = corners.tolist()
+        live = counts.tolist()
+        cacheTime = [0] * numVertices
+        emitted = bytearray(numTriangles)
+        deadEnd = []
+        order = []
+        misses = bytearray(numTriangles)
+        time = cacheSize + 1
+        cursor = 0
+
+        fanning = 0
+        while fanning >= 0:
+            # Emit the remaining triangles around the fanning vertex
+            candidates = []
+            for t in adjacency[starts[fanning]:starts[fanning + 1]]:
+                if emitted[t]:
+                    continue
+                emitted[t] = 1
+                triangle = corners[3 * t:3 * t + 3]
+                count = 0
+                for v in triangle:
+                    live[v] -= 1
+                    if time - cacheTime[v] > cacheSize:
+                        cacheTime[v] = time
+                        time += 1
+                        count += 1
+                misses[len(order)] = count
+                order.append(t)
+                candidates.extend(triangle)
+            deadEnd.extend(candidates)
+
+            # Pick the candidate that will still be in the cache after its remaining triangles are emitted,
+            # preferring the oldest
+            fanning = -1
+            best = -1
+            for v in candidates:
+                if live[v] > 0:
+                    age = time - cacheTime[v]
+                    priority = age if age + 2 * live[v] <= cacheSize else 0
+                    if priority > best:
+                        best = priority
+                        fanning = v
+
+            if fanning < 0:
+                # Continue from the most recent vertex that still has triangles, then from the input order
+                while deadEnd:
+                    v = deadEnd.pop()
+                    if live[v] > 0:
+                        fanning = v
+                        break
+                while fanning < 0 and cursor < numVertices:
+                    if live[cursor] > 0:
+                        fanning = cursor
+                    cursor += 1
+
+        misses = numpy.frombuffer(bytes(misses), dtype=numpy.uint8).astype(numpy.int64)
+        return numpy.array(order, dtype=numpy.int64), misses
+
+    @staticmethod
+    def overdrawOrder(_positions, _indices, _threshold=1.05, _cacheSize=None, _misses=None):
+        """Order clusters of cache optimised triangles to reduce overdraw
+
+        The order is split into clusters where the cache is restarted and the clusters are sorted so those
+        facing away from the centre of the mesh are drawn first, as they are more likely to hide the others.
+
+        Args:
+            _positions: The vertex positions with shape (v, 3)
+            _indices: The cache optimised triangle indices with shape (t, 3)
+            _threshold: How much the ACMR of a cluster may exceed the ACMR of the whole mesh
+            _cacheSize: The number of vertices in the cache, or None to use s_cacheSize
+            _misses: The cache misses of each triangle as returned by cacheMisses or tipsy, or None to simulate
+                     the cache
+
+        Returns:
+            The new order of the triangles
+        """
+
+        indices = numpy.asarray(_indices, dtype=numpy.int64).reshape(-1, 3)
+        if len(indices) == 0:
+            return numpy.zeros(0, dtype=numpy.int64)
+
+        misses = _misses
+        if misses is None:
+            misses = MeshOptimizer.cacheMisses(indices, _cacheSize)
+        limit = _threshold * misses.sum() / float(len(indices))
+
+        # Start a cluster at a triangle that misses all of its vertices once the current cluster is good enough
+        starts = [0]
+        cumulative = numpy.cumsum(misses)
+        for t in numpy.nonzero(misses == 3)[0][1:].tolist():
+            clusterMisses = cumulative[t - 1] - (cumulative[starts[-1] - 1] if starts[-1] > 0 else 0)
+            if clusterMisses <= limit * (t - starts[-1]):
+                starts.append(t)
+        starts = numpy.array(starts)
+
+        # The area weighted centroid and normal of each cluster
+        corners = numpy.asarray(_positions, dtype=numpy.float64)[indices]
+        normals = numpy.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+        areas = numpy.linalg.norm(normals, axis=1)
+        centroids = corners.mean(axis=1) * areas[:, None]
+
+        clusterAreas = numpy.maximum(numpy.add.reduceat(areas, starts), 1e-12)
+        clusterCentroids = numpy.add.reduceat(centroids, starts) / clusterAreas[:, None]
+        clusterNormals = numpy.add.reduceat(normals, starts)
+        clusterNormals /= numpy.maximum(numpy.linalg.norm(clusterNormals, axis=1), 1e-12)[:, None]
+        meshCentroid = centroids.sum(axis=0) / max(areas.sum(), 1e-12)
+
+        occlusion = numpy.sum((clusterCentroids - meshCentroid) * clusterNormals, axis=1)
+        clusters = numpy.argsort(-occlusion, kind='mergesort')
+
+        # Expand the sorted clusters into triangles
+        ends = numpy.append(starts[1:], len(indices))
+        lengths = (ends - starts)[clusters]
+        offsets = numpy.cumsum(lengths) - lengths
+        return numpy.repeat(starts[clusters] - offsets, lengths) + numpy.arange(len(indices))
+
+    @staticmethod
+    def fetchRemap(_indices, _numVertices):
+        """Find the order vertices are first used in an index buffer
+
+        Args:
+            _indices: The triangle indices
+            _numVertices: The number of vertices
+
+        Returns:
+            A tuple of the old index of each new vertex and the new index of each old vertex, which is -1
+            for unused vertices
+        """
+
+        flat = numpy.asarray(_indices, dtype=numpy.int64).ravel()
+        used, first = numpy.unique(flat, return_index=True)
+        order = used[numpy.argsort(first)]
+
+        remap = numpy.full(_numVertices, -1, dtype=numpy.int64)
+        remap[order] = numpy.arange(len(order))
+        return order, remap
+
+    def optimize(self, _overdraw=True, _threshold=1.05, _cacheSize=None):
+        """Reorder the triangles and vertices
+
+        Args:
+            _overdraw: Whether to also order the triangles to reduce overdraw
+            _threshold: How much the ACMR may increase when ordering for overdraw
+            _cacheSize: The number of vertices in the cache, or None to use s_cacheSize, which before and after
+                        are also measured with
+        """
+
+        # The cache simulated by Tipsy gives the misses of the cache optimised order without simulating it again
+        order, misses = MeshOptimizer.tipsy(self.m_indices, len(self.m_vertices), _cacheSize)
+        indices = self.m_indices[order]
+        if _overdraw:
+            indices = indices[MeshOptimizer.overdrawOrder(self.m_vertices[:, :3], indices, _threshold, _cacheSize,
+                                                          misses)]
+
+        order, remap = MeshOptimizer.fetchRemap(indices, len(self.m_vertices))
+        self.m_vertices = self.m_vertices[order]
+        self.m_indices = remap[indices]
+
+        if _cacheSize != self.m_cacheSize:
+            self.m_cacheSize = _cacheSize
+            self.m_before = None
+        self.m_after = None
+
+    def report(self):
+        """Describe the cache statistics before and after optimising
+
+        Returns:
+            The report as a string
+        """
+
+        before = self.before
+        after = self.after
+        return 'ACMR %.3f -> %.3f, ATVR %.3f -> %.3f' % (before[0], after[0], before[1], after[1])
@@ -0,0 +1,401 @@
+import numpy
+
+
+class MeshSimplifier(object):
+    """This class simplifies a triangle mesh using quadric error edge collapses
+
+    Edges are collapsed onto one of their end points (half edge collapses), so every level of detail
+    reuses the original vertices and only the indices change. Each pass collapses a set of edges that
+    do not share any vertices, which allows the costs and the collapses to be computed with NumPy.
+
+    Vertices with the same position are welded for the quadrics, so the triangles on both sides of an
+    attribute seam (such as the hard edges of a cube) stay connected. The seams and the open boundaries
+    are constraints: their vertices may only slide along them, and the vertices where they meet or end
+    never move.
+    """
+
+    # The weight of the planes that preserve open boundaries and attribute seams
+    s_boundaryWeight = 1000.0
+    # The number of rounds of edge matching in each pass
+    s_matchingRounds = 4
+    # The largest collapse error as a fraction of the mesh size, where the error is the area weighted
+    # root mean square distance to the original planes
+    s_maxError = 0.01
+    # The smallest cosine between the original and the simplified normal of a triangle
+    s_flipThreshold = 0.5
+
+    def __init__(self, _positions, _indices):
+        """The constructor
+
+        Args:
+            _positions: The vertex positions as an array of shape (n, 3), vertices with the same position
+                        and different attributes are duplicated
+            _indices: The triangle indices as an array of shape (m, 3) or a flat list
+        """
+
+        positions = numpy.asarray(_positions, dtype=numpy.float64).reshape(-1, 3)
+        self.m_faces = numpy.asarray(_indices, dtype=numpy.int64).reshape(-1, 3)
+
+        # Weld the vertices on their position, the collapses and the quadrics use the welded positions
+        if len(positions) > 0:
+            self.m_positions, positionIds = numpy.unique(positions, axis=0, return_inverse=True)
+            self.m_positionIds = positionIds.reshape(-1)
+            self.m_scale = numpy.linalg.norm(positions.max(axis=0) - positions.min(axis=0))
+        else:
+            self.m_positions = positions
+            self.m_positionIds = numpy.zeros(0, dtype=numpy.int64)
+            self.m_scale = 0.0
+
+        # The positions in homogeneous coordinates for evaluating the quadrics
+        self.m_homogeneous = numpy.hstack([self.m_positions, numpy.ones((len(self.m_positions), 1))])
+        # The original unit normal of each triangle, which the simplified triangles are checked against
+        self.m_normals, areas = MeshSimplifier.faceNormals(self.m_positions, self.m_positionIds[self.m_faces])
+        # The error quadric and the area of the triangles around each position
+        self.m_quadrics, self.m_areas = self.computeQuadrics(areas)
+
+    @staticmethod
+    def weld(_vertices, _stride=6):
+        """Merge identical vertices of an interleaved vertex array
+
+        Args:
+            _vertices: The interleaved vertex data as a flat list or array
+            _stride: The number of floats per vertex
+
+        Returns:
+            A tuple of the unique vertices with shape (n, _stride) and the triangle indices with shape (m, 3)
+        """
+
+        vertices = numpy.asarray(_vertices, dtype=numpy.float32).reshape(-1, _stride)
+        if len(vertices) == 0:
+            return vertices, numpy.zeros((0, 3), dtype=numpy.int64)
+
+        unique, inverse = numpy.unique(vertices, axis=0, return_inverse=True)
+        return unique, inverse.reshape(-1, 3)
+
+    @property
+    def numFaces(self):
+        return len(self.m_faces)
+
+    @property
+    def indices(self):
+        """Get the current triangle indices
+
+        Returns:
+            The indices as an array of shape (m, 3)
+        """
+
+        return self.m_faces.astype(numpy.uint32)
+
+    @staticmethod
+    def faceNormals(_positions, _faces):
+        """Compute the unit normal and the area of each triangle
+
+        Args:
+            _positions: The vertex positions as an array of shape (n, 3)
+            _faces: The triangle indices as an array of shape (m, 3)
+
+        Returns:
+            A tuple of the normals with shape (m, 3) and the areas with shape (m,)
+        """
+
+        p = _positions
+        f = _faces
+        normals = numpy.cross(p[f[:, 1]] - p[f[:, 0]], p[f[:, 2]] - p[f[:, 0]])
+        lengths = numpy.linalg.norm(normals, axis=1)
+        normals /= numpy.maximum(lengths, 1e-12)[:, None]
+        return normals, 0.5 * lengths
+
+    def constraintEdges(self):
+        """Find the half edges on an open boundary or an attribute seam
+
+        An edge is a seam when the triangles on either side use different vertices at the same positions.
+
+        Returns:
+            A tuple of the welded end points of each half edge with shape (3m, 2) and a boolean mask of the
+            half edges on a boundary or a seam
+        """
+
+        numPositions = len(self.m_positions)
+        edges = self.m_faces[:, [0, 1, 1, 2, 2, 0]].reshape(-1, 2)
+        ends = self.m_positionIds[edges]
+        keys = ends.min(axis=1) * numPositions + ends.max(axis=1)
+
+        # The vertices at the lower and the higher welded end point of each half edge
+        vertices = numpy.where((ends[:, 0] > ends[:, 1])[:, None], edges[:, ::-1], edges)
+
+        # Group the half edges of each edge and compare their vertices with the first half edge
+        order = numpy.argsort(keys)
+        sortedKeys = keys[order]
+        starts = numpy.ones(len(keys), dtype=bool)
+        starts[1:] = sortedKeys[1:] != sortedKeys[:-1]
+        groups = numpy.cumsum(starts) - 1
+        firsts = numpy.nonzero(starts)[0]
+        counts = numpy.diff(numpy.append(firsts, len(keys)))
+        sortedVertices = vertices[order]
+        differs = (sortedVertices != sortedVertices[firsts][groups]).any(axis=1)
+        seams = numpy.zeros(len(firsts), dtype=bool)
+        numpy.logical_or.at(seams, groups, differs)
+
+        constraint = numpy.empty(len(keys), dtype=bool)
+        constraint[order] = ((counts != 2) | seams)[groups]
+        return ends, constraint
+
+    def computeQuadrics(self, _areas):
+        """Compute the area weighted plane quadrics of every welded position
+
+        Args:
+            _areas: The area of each triangle
+
+        Returns:
+            A tuple of the 4x4 quadrics with shape (n, 4, 4) and the area around each position with shape (n,)
+        """
+
+        p = self.m_positions
+        f = self.m_positionIds[self.m_faces]
+        numVertices = len(p)
+        normals = self.m_normals
+
+        # The plane of each face
+        planes = numpy.hstack([normals, -numpy.einsum('ij,ij->i', normals, p[f[:, 0]])[:, None]])
+        faceQuadrics = numpy.einsum('ij,ik->ijk', planes, planes) * _areas[:, None, None]
+
+        # Add planes perpendicular to the boundary and seam edges so that the silhouette and seams are preserved
+        ends, constraint = self.constraintEdges()
+        boundary = numpy.nonzero(constraint)[0]
+        edgeQuadrics = numpy.zeros((0, 4, 4))
+        edgeVertices = numpy.zeros((0, 2), dtype=numpy.int64)
+        if len(boundary) > 0:
+            edgeVertices = ends[boundary]
+            direction = p[edgeVertices[:, 1]] - p[edgeVertices[:, 0]]
+            length = numpy.linalg.norm(direction, axis=1)
+            sideNormals = numpy.cross(direction, normals[boundary // 3])
+            sideNormals /= numpy.maximum(numpy.linalg.norm(sideNormals, axis=1), 1e-12)[:, None]
+            sidePlanes = numpy.hstack([sideNormals,
+                                       -numpy.einsum('ij,ij->i', sideNormals, p[edgeVertices[:, 0]])[:, None]])
+            edgeQuadrics = numpy.einsum('ij,ik->ijk', sidePlanes, sidePlanes) * \
+                (MeshSimplifier.s_boundaryWeight * length * length)[:, None, None]
+
+        # Accumulate the quadrics of the faces and edges around each vertex
+        ids = numpy.concatenate([f.ravel(), edgeVertices.ravel()])
+        weights = numpy.concatenate([numpy.repeat(faceQuadrics.reshape(-1, 16), 3, axis=0),
+                                     numpy.repeat(edgeQuadrics.reshape(-1, 16), 2, axis=0)])
+        quadrics = numpy.empty((numVertices, 16))
+        for i in range(16):
+            quadrics[:, i] = numpy.bincount(ids, weights=weights[:, i], minlength=numVertices)
+        areas = numpy.bincount(f.ravel(), weights=numpy.repeat(_areas, 3), minlength=numVertices)
+
+        return quadrics.reshape(-1, 4, 4), areas
+
+    @staticmethod
+    def degenerate(_faces):
+        """Find the triangles that reference the same vertex more than once
+
+        Args:
+            _faces: The triangle indices as an array of shape (m, 3)
+
+        Returns:
+            A boolean mask of the degenerate triangles
+        """
+
+        return (_faces[:, 0] == _faces[:, 1]) | (_faces[:, 1] == _faces[:, 2]) | (_faces[:, 2] == _faces[:, 0])
+
+    def attributeRemap(self, _remap):
+        """Find the vertex each vertex collapses onto from the collapses of the welded positions
+
+        Each vertex at a collapsed position moves onto the vertex at the target position that it shares a
+        triangle with, so the attributes on each side of a seam are kept.
+
+        Args:
+            _remap: The welded position each welded position collapses onto
+
+        Returns:
+            The vertex each vertex collapses onto, or -1 for the vertices without a triangle to follow
+        """
+
+        f = self.m_faces
+        positions = self.m_positionIds[f]
+        isMoved = _remap != numpy.arange(len(_remap))
+        remap = numpy.arange(len(self.m_positionIds))
+        remap[isMoved[self.m_positionIds]] = -1
+        for i, j in [(0, 1), (0, 2), (1, 0), (1, 2), (2, 0), (2, 1)]:
+            follow = isMoved[positions[:, i]] & (_remap[positions[:, i]] == positions[:, j])
+            remap[f[follow, i]] = f[follow, j]
+        return remap
+
+    def flippedVertices(self, _remap, _moved):
+        """Find the collapsed positions that would turn a remaining triangle away from its original normal
+
+        Args:
+            _remap: The welded position each welded position collapses onto
+            _moved: The welded positions that are being collapsed
+
+        Returns:
+            The moved positions that belong to a flipped triangle
+        """
+
+        f = self.m_positionIds[self.m_faces]
+        p = self.m_positions
+        isMoved = numpy.zeros(len(p), dtype=bool)
+        isMoved[_moved] = True
+        newFaces = _remap[f]
+        check = numpy.nonzero(isMoved[f].any(axis=1) & ~MeshSimplifier.degenerate(newFaces))[0]
+        if len(check) == 0:
+            return _moved[:0]
+
+        # Compare with the normals of the original mesh so that small turns do not add up over the passes
+        g = newFaces[check]
+        after = numpy.cross(p[g[:, 1]] - p[g[:, 0]], p[g[:, 2]] - p[g[:, 0]])
+        cosines = numpy.einsum('ij,ij->i', self.m_normals[check], after)
+        limits = MeshSimplifier.s_flipThreshold * numpy.linalg.norm(after, axis=1)
+        flipped = f[check[cosines <= limits]]
+        return numpy.unique(flipped[isMoved[flipped]])
+
+    def collapsePass(self, _maxCollapses, _maxError):
+        """Collapse the cheapest set of edges that do not share a vertex
+
+        Args:
+            _maxCollapses: The maximum number of edges to collapse
+            _maxError: The largest error of a collapse, as a distance
+
+        Returns:
+            The number of edges that were collapsed
+        """
+
+        f = self.m_faces
+        numVertices = len(self.m_positions)
+        if len(f) == 0 or _maxCollapses <= 0:
+            return 0
+
+        # Find the unique edges between the welded positions and whether they are on a boundary or a seam
+        ends, constraint = self.constraintEdges()
+        edges = numpy.sort(ends, axis=1)
+        keys, first = numpy.unique(edges[:, 0] * numVertices + edges[:, 1], return_index=True)
+        a = keys // numVertices
+        b = keys % numVertices
+        onConstraint = constraint[first]
+
+        # Positions on two constraint edges may only slide along them, the ends and the crossings of the
+        # constraints never move
+        numConstraints = numpy.bincount(numpy.concatenate([a[onConstraint], b[onConstraint]]), minlength=numVertices)
+        locked = (numConstraints == 1) | (numConstraints > 2)
+        movesA = ~locked[a] & ((numConstraints[a] == 0) | onConstraint)
+        movesB = ~locked[b] & ((numConstraints[b] == 0) | onConstraint)
+
+        # The error of moving both end points onto either end point, relative to the area around them
+        q = self.m_quadrics[a] + self.m_quadrics[b]
+        areas = numpy.maximum(self.m_areas[a] + self.m_areas[b], 1e-12)
+        costA = numpy.einsum('ij,ijk,ik->i', self.m_homogeneous[a], q, self.m_homogeneous[a]) / areas
+        costB = numpy.einsum('ij,ijk,ik->i', self.m_homogeneous[b], q, self.m_homogeneous[b]) / areas
+        costA[~movesB] = numpy.inf
+        costB[~movesA] = numpy.inf
+        toA = costA <= costB
+        src = numpy.where(toA, b, a)
+        dst = numpy.where(toA, a, b)
+        cost = numpy.where(toA, costA, costB)
+        # Break the ties between equal costs in a scattered order, in the order of the keys only a few edges
+        # of a flat region would be the cheapest edge of both of their end points
+        scatter = keys.astype(numpy.uint64) * numpy.uint64(2654435761) % numpy.uint64(1 << 32)
+
+        remap = numpy.arange(numVertices)
+        locked = numpy.zeros(numVertices, dtype=bool)
+        available = cost <= _maxError * _maxError
+        numCollapses = 0
+        for i in range(MeshSimplifier.s_matchingRounds):
+            candidates = numpy.nonzero(available)[0]
+            if len(candidates) == 0 or numCollapses >= _maxCollapses:
+                break
+
+            # Keep the edges that are the cheapest edge of both of their end points
+            rank = numpy.empty(len(candidates), dtype=numpy.int64)
+            rank[numpy.lexsort((scatter[candidates], cost[candidates]))] = numpy.arange(len(candidates))
+            best = numpy.full(numVertices, len(candidates), dtype=numpy.int64)
+            numpy.minimum.at(best, a[candidates], rank)
+            numpy.minimum.at(best, b[candidates], rank)
+            matched = (best[a[candidates]] == rank) & (best[b[candidates]] == rank)
+            chosen = candidates[matched][numpy.argsort(rank[matched])][:_maxCollapses - numCollapses]
+            available[chosen] = False
+            moved = src[chosen]
+            remap[moved] = dst[chosen]
+
+            # Reject the collapses that would leave a vertex without a vertex to follow across a seam
+            unmapped = numpy.unique(self.m_positionIds[f[self.attributeRemap(remap)[f] < 0]])
+            remap[unmapped] = unmapped
+            moved = moved[remap[moved] != moved]
+
+            # Reject the collapses that would flip a triangle, until keeping those vertices flips nothing else
+            rejected = self.flippedVertices(remap, moved)
+            while len(rejected) > 0:
+                remap[rejected] = rejected
+                moved = moved[remap[moved] != moved]
+                rejected = self.flippedVertices(remap, moved)
+            numCollapses += len(moved)
+
+            # Later rounds may not touch the vertices of the collapses made in this round
+            accepted = chosen[remap[src[chosen]] != src[chosen]]
+            locked[a[accepted]] = True
+            locked[b[accepted]] = True
+            available &= ~(locked[a] | locked[b])
+
+        collapsed = numpy.nonzero(remap != numpy.arange(numVertices))[0]
+        if len(collapsed) == 0:
+            return 0
+
+        # Merge the quadrics and remove the degenerate and duplicate triangles
+        self.m_quadrics[remap[collapsed]] += self.m_quadrics[collapsed]
+        self.m_areas[remap[collapsed]] += self.m_areas[collapsed]
+        newFaces = self.attributeRemap(remap)[f]
+        keep = numpy.nonzero(~MeshSimplifier.degenerate(self.m_positionIds[newFaces]))[0]
+        if len(keep) > 0:
+            _, first = numpy.unique(numpy.sort(newFaces[keep], axis=1), axis=0, return_index=True)
+            keep = keep[numpy.sort(first)]
+        self.m_faces = newFaces[keep]
+        self.m_normals = self.m_normals[keep]
+
+        return len(collapsed)
+
+    def simplify(self, _targetFaces, _maxError=None):
+        """Collapse edges until the mesh has at most the target number of triangles
+
+        The mesh may end up with more triangles if no more edges can be collapsed, or if every remaining
+        collapse would move the surface further than the error bound.
+
+        Args:
+            _targetFaces: The target number of triangles
+            _maxError: The largest collapse error as a fraction of the mesh size, or None for s_maxError
+
+        Returns:
+            The simplified triangle indices as an array of shape (m, 3)
+        """
+
+        maxError = MeshSimplifier.s_maxError if _maxError is None else _maxError
+        while len(self.m_faces) > _targetFaces:
+            # Each collapse removes about two triangles
+            maxCollapses = max((len(self.m_faces) - _targetFaces + 1) // 2, 1)
+            if self.collapsePass(maxCollapses, maxError * self.m_scale) == 0:
+                break
+
+        return self.indices
+
+    def buildLevels(self, _ratios, _maxError=None):
+        """Build progressively simplified levels of detail
+
+        Once the error bound stops the simplification, the following levels are the same array as the
+        previous level.
+
+        Args:
+            _ratios: The fraction of the original triangles to keep for each level, in decreasing order
+            _maxError: The largest collapse error as a fraction of the mesh size, or None for s_maxError
+
+        Returns:
+            A list of triangle index arrays, one for each level
+        """
+
+        numFaces = len(self.m_faces)
+        levels = []
+        for ratio in _ratios:
+            indices = self.simplify(int(numpy.ceil(numFaces * ratio)), _maxError)
+            # Reuse the previous level when nothing more was collapsed
+            if len(levels) > 0 and len(indices) == len(levels[-1]):
+                indices = levels[-1]
+            levels.append(indices)
+        return levels
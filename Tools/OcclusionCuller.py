@@ -0,0 +1,277 @@
+import threading
+import numpy
+
+
+class OcclusionCuller(object):
+    """This class culls objects hidden behind occluders using a low resolution software depth buffer
+
+    The occluder meshes are rasterised with NumPy into a small depth buffer, which is reduced into a
+    pyramid where each texel stores the furthest depth of the texels below it. An object is hidden if
+    the nearest point of its bounding box is behind the furthest occluder depth over its screen rectangle.
+    A pixel is covered if its centre is inside a triangle, so meshes are rasterised without gaps along their
+    shared edges, and it stores the furthest depth of the triangle over the pixel rather than at its centre.
+    """
+
+    # The maximum number of pixels tested at once while rasterising
+    s_batchSize = 1 << 20
+    # Whether each corner of a box uses the minimum or maximum along each axis
+    s_corners = numpy.array([[(i >> axis) & 1 for axis in range(3)] for i in range(8)])
+
+    def __init__(self, _width=256, _height=128):
+        """The constructor
+
+        Args:
+            _width: The width of the depth buffer, which must be a power of 2
+            _height: The height of the depth buffer, which must be a power of 2
+        """
+
+        self.m_width = _width
+        self.m_height = _height
+        # A list of (positions, indices, model matrix) tuples
+        self.m_occluders = []
+        # The depth pyramid, from the full resolution depth buffer to a single texel
+        self.m_pyramid = []
+        # The view-projection matrix the pyramid was rendered with
+        self.m_vpMatrix = None
+        self.m_thread = None
+        self.clearDepth()
+
+    @property
+    def depth(self):
+        """Get the depth buffer
+
+        Returns:
+            The normalised device depth of each pixel with shape (height, width), with row 0 at the bottom
+        """
+
+        return self.m_pyramid[0]
+
+    @property
+    def pyramid(self):
+        return self.m_pyramid
+
+    def addOccluder(self, _positions, _indices, _modelMatrix=None):
+        """Add an occluder mesh
+
+        Args:
+            _positions: The vertex positions with shape (v, 3)
+            _indices: The triangle indices with shape (t, 3)
+            _modelMatrix: The model matrix of the mesh, or None if the positions are in world space
+        """
+
+        if _modelMatrix is None:
+            modelMatrix = numpy.identity(4)
+        else:
+            modelMatrix = numpy.asarray(_modelMatrix, dtype=numpy.float64)
+
+        positions = numpy.asarray(_positions, dtype=numpy.float64).reshape(-1, 3)
+        indices = numpy.asarray(_indices, dtype=numpy.int64).reshape(-1, 3)
+        self.m_occluders.append((positions, indices, modelMatrix))
+
+    def clearOccluders(self):
+        """Remove all the occluders"""
+
+        self.m_occluders = []
+
+    def clearDepth(self):
+        """Clear the depth buffer to the far plane"""
+
+        self.m_pyramid = [numpy.ones((self.m_height, self.m_width))]
+        self.buildPyramid()
+
+    def render(self, _vpMatrix):
+        """Rasterise the occluders and build the depth pyramid
+
+        Args:
+            _vpMatrix: A VPMatrix or Camera providing the view-projection matrix
+        """
+
+        vp = numpy.asarray(_vpMatrix.matrix, dtype=numpy.float64)
+        depth = numpy.ones(self.m_width * self.m_height)
+
+        for positions, indices, modelMatrix in self.m_occluders:
+            homogeneous = numpy.hstack([positions, numpy.ones((len(positions), 1))])
+            clip = homogeneous.dot(modelMatrix.dot(vp))
+
+            # Drop the triangles that cross the near plane, which only removes occlusion
+            triangles = indices[(clip[indices, 3] > 1e-6).all(axis=1)]
+            w = numpy.maximum(clip[:, 3], 1e-6)
+            screen = numpy.empty((len(clip), 3))
+            screen[:, 0] = (clip[:, 0] / w * 0.5 + 0.5) * self.m_width
+            screen[:, 1] = (clip[:, 1] / w * 0.5 + 0.5) * self.m_height
+            screen[:, 2] = clip[:, 2] / w
+
+            self.rasterize(screen[triangles], depth)
+
+        self.m_pyramid = [depth.reshape(self.m_height, self.m_width)]
+        self.m_vpMatrix = vp
+        self.buildPyramid()
+
+    def rasterize(self, _triangles, _depth):
+        """Rasterise triangles into a depth buffer
+
+        Args:
+            _triangles: The screen space vertices of the triangles with shape (t, 3, 3)
+            _depth: The flattened depth buffer to write the nearest depths into
+        """
+
+        x = _triangles[:, :, 0]
+        y = _triangles[:, :, 1]
+        z = _triangles[:, :, 2]
+        area = (x[:, 1] - x[:, 0]) * (y[:, 2] - y[:, 0]) - (x[:, 2] - x[:, 0]) * (y[:, 1] - y[:, 0])
+
+        # The pixels whose centres are inside the bounding rectangle of each triangle
+        x0 = numpy.clip(numpy.ceil(x.min(axis=1) - 0.5), 0, self.m_width).astype(numpy.int64)
+        x1 = numpy.clip(numpy.floor(x.max(axis=1) - 0.5), -1, self.m_width - 1).astype(numpy.int64)
+        y0 = numpy.clip(numpy.ceil(y.min(axis=1) - 0.5), 0, self.m_height).astype(numpy.int64)
+        y1 = numpy.clip(numpy.floor(y.max(axis=1) - 0.5), -1, self.m_height - 1).astype(numpy.int64)
+        width = numpy.maximum(x1 - x0 + 1, 0)
+        counts = width * numpy.maximum(y1 - y0 + 1, 0)
+
+        keep = (counts > 0) & (numpy.abs(area) > 1e-12)
+        x, y, z, area = x[keep], y[keep], z[keep], area[keep]
+        x0, y0, width, counts = x0[keep], y0[keep], width[keep], counts[keep]
+
+        # The edge functions, oriented so the inside is positive, and the depth plane
+        sign = numpy.sign(area)
+        edgeX = (numpy.roll(x, -1, axis=1) - x) * sign[:, None]
+        edgeY = (numpy.roll(y, -1, axis=1) - y) * sign[:, None]
+        dzdx = ((z[:, 1] - z[:, 0]) * (y[:, 2] - y[:, 0]) - (z[:, 2] - z[:, 0]) * (y[:, 1] - y[:, 0])) / area
+        dzdy = ((z[:, 2] - z[:, 0]) * (x[:, 1] - x[:, 0]) - (z[:, 1] - z[:, 0]) * (x[:, 2] - x[:, 0])) / area
+        # Moving from a pixel centre to its furthest corner changes the depth by at most this much
+        depthMargin = 0.5 * (numpy.abs(dzdx) + numpy.abs(dzdy))
+        maxDepth = z.max(axis=1)
+
+        # Rasterise batches of triangles so the number of candidate pixels stays bounded
+        ends = numpy.cumsum(counts)
+        start = 0
+        while start < len(counts):
+            offset = ends[start] - counts[start]
+            end = max(numpy.searchsorted(ends, offset + OcclusionCuller.s_batchSize, side='right'), start + 1)
+            batch = numpy.arange(start, end)
+            start = end
+
+            # Expand each triangle into the pixels of its bounding rectangle
+            triangle = numpy.repeat(batch, counts[batch])
+            local = numpy.arange(len(triangle)) - numpy.repeat(ends[batch] - counts[batch] - offset, counts[batch])
+            px = x0[triangle] + local % width[triangle]
+            py = y0[triangle] + local // width[triangle]
+            cx = px + 0.5
+            cy = py + 0.5
+
+            # Keep the pixels whose centres are inside all three edges
+            inside = numpy.ones(len(triangle), dtype=bool)
+            for i in range(3):
+                edge = edgeX[triangle, i] * (cy - y[triangle, i]) - edgeY[triangle, i] * (cx - x[triangle, i])
+                inside &= edge >= 0.0
+
+            triangle = triangle[inside]
+            cx = cx[inside]
+            cy = cy[inside]
+            pixelDepth = z[triangle, 0] + dzdx[triangle] * (cx - x[triangle, 0]) + \
+                dzdy[triangle] * (cy - y[triangle, 0])
+            pixelDepth = numpy.minimum(pixelDepth + depthMargin[triangle], maxDepth[triangle])
+
+            pixel = py[inside] * self.m_width + px[inside]
+            numpy.minimum.at(_depth, pixel, pixelDepth)
+
+    def buildPyramid(self):
+        """Reduce the depth buffer into a pyramid of the furthest depths"""
+
+        pyramid = self.m_pyramid[:1]
+        level = pyramid[0]
+        while level.shape[0] > 1 or level.shape[1] > 1:
+            height = max(level.shape[0] // 2, 1)
+            width = max(level.shape[1] // 2, 1)
+            level = level.reshape(height, level.shape[0] // height, width, level.shape[1] // width).max(axis=(1, 3))
+            pyramid.append(level)
+
+        self.m_pyramid = pyramid
+
+    def renderAsync(self, _vpMatrix):
+        """Render the occluders on a worker thread, call wait before testing
+
+        Args:
+            _vpMatrix: A VPMatrix or Camera providing the view-projection matrix
+        """
+
+        self.wait()
+        self.m_thread = threading.Thread(target=self.render, args=(_vpMatrix,))
+        self.m_thread.start()
+
+    def wait(self):
+        """Wait for a render started by renderAsync to finish"""
+
+        if self.m_thread is not None:
+            self.m_thread.join()
+            self.m_thread = None
+
+    def test(self, _bounds, _matrices=None):
+        """Test bounding boxes against the depth pyramid
+
+        Args:
+            _bounds: The bounding boxes as an array of shape (k, 2, 3), or (2, 3) if all objects share them
+            _matrices: The model matrices as an array of shape (k, 4, 4), or None if the bounds are in world space
+
+        Returns:
+            A boolean mask of the objects that may be visible
+        """
+
+        self.wait()
+        bounds = numpy.asarray(_bounds, dtype=numpy.float64)
+        if _matrices is not None:
+            matrices = numpy.asarray(_matrices, dtype=numpy.float64).reshape(-1, 4, 4)
+            if bounds.ndim == 2:
+                bounds = numpy.repeat(bounds[None], len(matrices), axis=0)
+        else:
+            bounds = bounds.reshape(-1, 2, 3)
+
+        if self.m_vpMatrix is None:
+            return numpy.ones(len(bounds), dtype=bool)
+
+        # Project the 8 corners of every box
+        corners = bounds[:, OcclusionCuller.s_corners, numpy.arange(3)]
+        if _matrices is not None:
+            matrices = numpy.matmul(matrices, self.m_vpMatrix)
+            clip = numpy.matmul(corners, matrices[:, :3]) + matrices[:, None, 3]
+        else:
+            clip = corners.dot(self.m_vpMatrix[:3]) + self.m_vpMatrix[3]
+
+        # Boxes crossing the near plane are always visible
+        crossesNear = (clip[:, :, 3] <= 1e-6).any(axis=1)
+        w = numpy.where(crossesNear[:, None], 1.0, clip[:, :, 3])
+        ndc = clip[:, :, :3] / w[..., None]
+
+        # The screen rectangle in pixels and the nearest depth of each box
+        xMin = numpy.floor((ndc[:, :, 0].min(axis=1) * 0.5 + 0.5) * self.m_width).astype(numpy.int64)
+        xMax = numpy.floor((ndc[:, :, 0].max(axis=1) * 0.5 + 0.5) * self.m_width).astype(numpy.int64)
+        yMin = numpy.floor((ndc[:, :, 1].min(axis=1) * 0.5 + 0.5) * self.m_height).astype(numpy.int64)
+        yMax = numpy.floor((ndc[:, :, 1].max(axis=1) * 0.5 + 0.5) * self.m_height).astype(numpy.int64)
+        nearest = ndc[:, :, 2].min(axis=1)
+
+        offscreen = (xMax < 0) | (yMax < 0) | (xMin >= self.m_width) | (yMin >= self.m_height)
+        xMin = numpy.clip(xMin, 0, self.m_width - 1)
+        xMax = numpy.clip(xMax, 0, self.m_width - 1)
+        yMin = numpy.clip(yMin, 0, self.m_height - 1)
+        yMax = numpy.clip(yMax, 0, self.m_height - 1)
+
+        # Pick the level where the rectangle covers at most 2x2 texels
+        size = numpy.maximum(xMax - xMin, yMax - yMin)
+        level = numpy.zeros(len(bounds), dtype=numpy.int64)
+        while (size >> level > 0).any():
+            level += (size >> level) > 0
+        level = numpy.minimum(level, len(self.m_pyramid) - 1)
+
+        # Find the furthest occluder depth over each rectangle
+        furthest = numpy.ones(len(bounds))
+        for l in numpy.unique(level):
+            objects = numpy.nonzero(level == l)[0]
+            texels = self.m_pyramid[l]
+            tx0 = numpy.minimum(xMin[objects] >> l, texels.shape[1] - 1)
+            tx1 = numpy.minimum(xMax[objects] >> l, texels.shape[1] - 1)
+            ty0 = numpy.minimum(yMin[objects] >> l, texels.shape[0] - 1)
+            ty1 = numpy.minimum(yMax[objects] >> l, texels.shape[0] - 1)
+            furthest[objects] = numpy.maximum(numpy.maximum(texels[ty0, tx0], texels[ty0, tx1]),
+                                              numpy.maximum(texels[ty1, tx0], texels[ty1, tx1]))
+
+        return crossesNear | (~offscreen & (nearest <= furthest))
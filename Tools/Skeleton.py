@@ -0,0 +1,121 @@
+import numpy
+
+
+class Skeleton(object):
+    """This class stores a bone hierarchy and computes skinning palettes for many instances at once"""
+
+    # The number of vertices of all the instances skinned together, which bounds the memory used by skin
+    s_batchVertices = 1 << 18
+
+    def __init__(self, _parents, _inverseBindMatrices=None):
+        """The constructor
+
+        Args:
+            _parents: The index of the parent of each bone, or -1 for a root bone
+            _inverseBindMatrices: The inverse of each bone's world matrix in the bind pose, with shape (b, 4, 4),
+                                  or None to use identity matrices
+        """
+
+        self.m_parents = numpy.asarray(_parents, dtype=numpy.int64)
+        numBones = len(self.m_parents)
+        if _inverseBindMatrices is None:
+            self.m_inverseBind = numpy.tile(numpy.identity(4), (numBones, 1, 1))
+        else:
+            self.m_inverseBind = numpy.asarray(_inverseBindMatrices, dtype=numpy.float64).reshape(numBones, 4, 4)
+
+        # Group the bones by depth so each depth can be composed in one operation
+        depth = numpy.full(numBones, -1, dtype=numpy.int64)
+        for bone in range(numBones):
+            chain = []
+            current = bone
+            while current >= 0 and depth[current] < 0:
+                chain.append(current)
+                current = self.m_parents[current]
+            base = depth[current] if current >= 0 else -1
+            for i, b in enumerate(reversed(chain)):
+                depth[b] = base + 1 + i
+        self.m_levels = [numpy.nonzero(depth == d)[0] for d in range(depth.max() + 1)]
+
+    @property
+    def numBones(self):
+        return len(self.m_parents)
+
+    @property
+    def parents(self):
+        return self.m_parents
+
+    def worldMatrices(self, _localMatrices):
+        """Compose the local matrices of the bones down the hierarchy
+
+        Args:
+            _localMatrices: The local matrices with shape (n, b, 4, 4), which multiply row vectors
+
+        Returns:
+            The world matrices with shape (n, b, 4, 4)
+        """
+
+        local = numpy.asarray(_localMatrices, dtype=numpy.float64)
+        world = numpy.empty_like(local)
+        world[:, self.m_levels[0]] = local[:, self.m_levels[0]]
+        for bones in self.m_levels[1:]:
+            world[:, bones] = numpy.matmul(local[:, bones], world[:, self.m_parents[bones]])
+
+        return world
+
+    def palettes(self, _localMatrices):
+        """Compute the skinning matrices of the bones
+
+        Args:
+            _localMatrices: The local matrices with shape (n, b, 4, 4), as returned by AnimationClip.sample
+
+        Returns:
+            The skinning matrices with shape (n, b, 4, 4)
+        """
+
+        return numpy.matmul(self.m_inverseBind[None], self.worldMatrices(_localMatrices))
+
+    @staticmethod
+    def skin(_palettes, _positions, _normals, _boneIndices, _weights):
+        """Blend the vertices by the skinning matrices of their bones
+
+        Only the affine 4x3 part of the matrices is blended, in single precision, and the instances are skinned
+        in batches of about s_batchVertices vertices to bound the memory used.
+
+        Args:
+            _palettes: The skinning matrices with shape (n, b, 4, 4)
+            _positions: The bind pose positions with shape (v, 3)
+            _normals: The bind pose normals with shape (v, 3)
+            _boneIndices: The bones influencing each vertex with shape (v, k)
+            _weights: The weight of each influence with shape (v, k)
+
+        Returns:
+            A tuple of the skinned positions and normals, each with shape (n, v, 3)
+        """
+
+        positions = numpy.asarray(_positions, dtype=numpy.float32)
+        normals = numpy.asarray(_normals, dtype=numpy.float32)
+        boneIndices = numpy.asarray(_boneIndices, dtype=numpy.int64)
+        weights = numpy.asarray(_weights, dtype=numpy.float32)
+
+        numInstances = len(_palettes)
+        skinnedPositions = numpy.empty((numInstances, len(positions), 3), dtype=numpy.float32)
+        skinnedNormals = numpy.empty((numInstances, len(positions), 3), dtype=numpy.float32)
+        batchSize = max(Skeleton.s_batchVertices // max(len(positions), 1), 1)
+
+        for start in range(0, numInstances, batchSize):
+            end = min(start + batchSize, numInstances)
+            # The last column of an affine matrix multiplying row vectors is always (0, 0, 0, 1)
+            palettes = numpy.asarray(_palettes[start:end, :, :, :3], dtype=numpy.float32)
+
+            # Blend the matrices of one influence at a time to avoid gathering all of them at once
+            blended = numpy.zeros((end - start, len(positions), 4, 3), dtype=numpy.float32)
+            for k in range(boneIndices.shape[1]):
+                blended += palettes[:, boneIndices[:, k]] * weights[None, :, k, None, None]
+
+            skinnedPositions[start:end] = numpy.einsum('vj,nvjl->nvl', positions, blended[:, :, :3])
+            skinnedPositions[start:end] += blended[:, :, 3]
+            skinnedNormals[start:end] = numpy.einsum('vj,nvjl->nvl', normals, blended[:, :, :3])
+
+        skinnedNormals /= numpy.maximum(numpy.linalg.norm(skinnedNormals, axis=-1), 1e-12)[..., None]
+
+        return skinnedPositions, skinnedNormals
@@ -100,3 +100,21 @@ class VPMatrix(object):
         """
 
         return numpy.array(self.m_matrix)
+
+    @property
+    def frustumPlanes(self):
+        """Get the planes of the view frustum in world space
+
+        The matrix multiplies row vectors, so the planes are extracted from its columns.
+
+        Returns:
+            An array of shape (6, 4) with the normalised planes (a, b, c, d) in the order
+            left, right, bottom, top, near, far. A point is inside a plane if ax + by + cz + d >= 0.
+        """
+
+        m = numpy.array(self.matrix)
+        planes = numpy.array([m[:, 3] + m[:, 0], m[:, 3] - m[:, 0],
+                              m[:, 3] + m[:, 1], m[:, 3] - m[:, 1],
+                              m[:, 3] + m[:, 2], m[:, 3] - m[:, 2]])
+
+        return planes / numpy.linalg.norm(planes[:, :3], axis=1)[:, None]
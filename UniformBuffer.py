@@ -0,0 +1,107 @@
+import OpenGL.GL as gl
+import numpy
+from GLBackend import GLBackend
+from ShaderStore import ShaderStore
+
+
+class UniformBuffer(object):
+    """This class stores the per-frame data shared by all shader programs in a uniform buffer object
+
+    The data is packed in the std140 layout and matches this GLSL declaration:
+
+        layout(std140) uniform FrameData
+        {
+            mat4 view;
+            mat4 projection;
+            mat4 VP;
+            vec4 cameraPosition;
+            float time;
+        };
+    """
+
+    # The std140 layout of the frame data, a mat4 is 64 bytes and a vec3 is padded to 16 bytes
+    s_frameDataType = numpy.dtype({'names': ['view', 'projection', 'VP', 'cameraPosition', 'time'],
+                                   'formats': [(numpy.float32, (4, 4)), (numpy.float32, (4, 4)),
+                                               (numpy.float32, (4, 4)), (numpy.float32, 4), numpy.float32],
+                                   'offsets': [0, 64, 128, 192, 208],
+                                   'itemsize': 224})
+
+    def __init__(self, _blockName="FrameData", _bindingPoint=0):
+        """The constructor
+
+        Args:
+            _blockName: The name of the uniform block in the GLSL source
+            _bindingPoint: The uniform buffer binding point to use
+        """
+
+        self.m_blockName = _blockName
+        self.m_bindingPoint = _bindingPoint
+        # The CPU side copy of the frame data
+        self.m_data = numpy.zeros(1, dtype=UniformBuffer.s_frameDataType)
+        self.m_data['cameraPosition'][0][3] = 1.0
+
+        # Allocate the buffer and attach it to the binding point
+        backend = GLBackend.current()
+        self.m_ubo = backend.glGenBuffers(1)
+        self.bind()
+        backend.glBufferData(gl.GL_UNIFORM_BUFFER, self.m_data.nbytes, None, gl.GL_DYNAMIC_DRAW)
+        self.unbind()
+        backend.glBindBufferBase(gl.GL_UNIFORM_BUFFER, self.m_bindingPoint, GLBackend.resolve(self.m_ubo))
+
+        # Connect the block in all current and future shader programs
+        ShaderStore.registerUniformBlock(self.m_blockName, self.m_bindingPoint)
+
+    @property
+    def blockName(self):
+        return self.m_blockName
+
+    @property
+    def bindingPoint(self):
+        return self.m_bindingPoint
+
+    @property
+    def data(self):
+        return self.m_data[0]
+
+    def bind(self):
+        """Bind the UBO"""
+
+        GLBackend.current().glBindBuffer(gl.GL_UNIFORM_BUFFER, GLBackend.resolve(self.m_ubo))
+
+    def unbind(self):
+        """Unbind the UBO"""
+
+        GLBackend.current().glBindBuffer(gl.GL_UNIFORM_BUFFER, 0)
+
+    def setCamera(self, _camera):
+        """Copy the view, projection and VP matrices and the position from a camera
+
+        The matrices are stored row major with row vectors, which is the same memory layout
+        as the column major std140 matrices, so no transpose is needed.
+
+        Args:
+            _camera: The camera to copy the data from
+        """
+
+        data = self.m_data[0]
+        data['view'] = _camera.viewMatrix
+        data['projection'] = _camera.projectionMatrix
+        data['VP'] = _camera.matrix
+        data['cameraPosition'][:3] = _camera.position
+
+    def setTime(self, _time):
+        """Set the time
+
+        Args:
+            _time: The time in seconds
+        """
+
+        self.m_data['time'] = _time
+
+    def update(self):
+        """Upload the frame data to the GPU, this only needs to be called once per frame"""
+
+        self.bind()
+        # Upload the raw bytes, as the GL array handlers do not accept structured dtypes
+        GLBackend.current().glBufferSubData(gl.GL_UNIFORM_BUFFER, 0, self.m_data.nbytes, self.m_data.view(numpy.uint8))
+        self.unbind()
@@ -1,5 +1,6 @@
 import OpenGL.GL as gl
 import numpy
+from GLBackend import GLBackend
 
 
 class VAO(object):
@@ -8,7 +9,9 @@ class VAO(object):
     def __init__(self):
         """The constructor"""
 
-        self.m_vao = gl.glGenVertexArrays(1)
+        self.m_vao = GLBackend.current().glGenVertexArrays(1)
+        self.m_vbo = None
+        self.m_ebo = None
         self.m_numVertices = 0
         self.m_numElements = 0
 
@@ -29,19 +32,52 @@ class VAO(object):
         self.m_numElements = _numElements
 
     def draw(self):
+        """Draw the vertices in order, use drawElements to draw the element buffer"""
+
+        self.bind()
+        GLBackend.current().glDrawArrays(gl.GL_TRIANGLES, 0, self.m_numVertices)
+        self.unbind()
+
+    def drawElements(self, _first=0, _count=None):
+        """Draw a range of the element buffer
+
+        Args:
+            _first: The index of the first element to draw
+            _count: The number of elements to draw, or None to use numElements
+        """
+
+        count = _count
+        if count is None:
+            count = self.m_numElements
+
         self.bind()
-        gl.glDrawArrays(gl.GL_TRIANGLES, 0, self.m_numVertices)
+        GLBackend.current().glDrawElements(gl.GL_TRIANGLES, count, gl.GL_UNSIGNED_INT, gl.ctypes.c_void_p(_first * 4))
         self.unbind()
 
+    def delete(self):
+        """Delete the VAO and its buffers, the VAO cannot be used afterwards"""
+
+        backend = GLBackend.current()
+        buffers = [GLBackend.resolve(buffer) for buffer in (self.m_vbo, self.m_ebo) if buffer is not None]
+        if buffers:
+            backend.glDeleteBuffers(len(buffers), buffers)
+        backend.glDeleteVertexArrays(1, [GLBackend.resolve(self.m_vao)])
+
+        self.m_vao = None
+        self.m_vbo = None
+        self.m_ebo = None
+        self.m_numVertices = 0
+        self.m_numElements = 0
+
     def bind(self):
         """Bind the VAO"""
 
-        gl.glBindVertexArray(self.m_vao)
+        GLBackend.current().glBindVertexArray(GLBackend.resolve(self.m_vao))
 
     def unbind(self):
         """Unbind the VAO"""
 
-        gl.glBindVertexArray(0)
+        GLBackend.current().glBindVertexArray(0)
 
     def genArrayBuffer(self, _data, _drawType=gl.GL_STATIC_DRAW):
         """Generate a vertex buffer object and initialise the data
@@ -55,28 +91,54 @@ class VAO(object):
         if type(_data) is list:
             data = numpy.array(_data, dtype=numpy.float32)
 
+        backend = GLBackend.current()
         self.bind()
-        self.m_vbo = gl.glGenBuffers(1)
-        gl.glBindBuffer(gl.GL_ARRAY_BUFFER, self.m_vbo)
-        gl.glBufferData(gl.GL_ARRAY_BUFFER, data.itemsize * len(data), data, _drawType)
+        self.m_vbo = backend.glGenBuffers(1)
+        backend.glBindBuffer(gl.GL_ARRAY_BUFFER, GLBackend.resolve(self.m_vbo))
+        backend.glBufferData(gl.GL_ARRAY_BUFFER, data.itemsize * len(data), data, _drawType)
         self.unbind()
 
-    def genElementBuffer(self, _indices, _drawType=gl.GL_STATIC_DRAW):
+    def updateArrayBuffer(self, _data, _offset=0):
+        """Replace part of the data in the vertex buffer object
+
+        Args:
+            _data: The new data
+            _offset: The number of bytes into the buffer to start writing at
+        """
+
+        data = _data
+        if type(_data) is list:
+            data = numpy.array(_data, dtype=numpy.float32)
+
+        backend = GLBackend.current()
+        backend.glBindBuffer(gl.GL_ARRAY_BUFFER, GLBackend.resolve(self.m_vbo))
+        backend.glBufferSubData(gl.GL_ARRAY_BUFFER, _offset, data.itemsize * len(data), data)
+        backend.glBindBuffer(gl.GL_ARRAY_BUFFER, 0)
+
+    def genElementBuffer(self, _indices, _drawType=gl.GL_STATIC_DRAW, _optimize=False):
         """Generate an element buffer object and initialise the data
 
         Args:
             _indices: The indices to pass to the GPU
             _drawType: The type of drawing, either gl.GL_STATIC_DRAW, gl.GL_DYNAMIC_DRAW or gl.GL_STREAM_DRAW
+            _optimize: Whether to reorder the triangles for the vertex cache, see MeshOptimizer
         """
 
         indices = _indices
         if type(_indices) is list:
             indices = numpy.array(_indices, dtype=numpy.uint32)
 
+        if _optimize:
+            # Only import the optimizer when it is used, as most buffers are not optimised
+            from Tools.MeshOptimizer import MeshOptimizer
+            triangles = numpy.asarray(indices).reshape(-1, 3)
+            indices = triangles[MeshOptimizer.vertexCacheOrder(triangles)].astype(numpy.uint32).ravel()
+
+        backend = GLBackend.current()
         self.bind()
-        self.m_ebo = gl.glGenBuffers(1)
-        gl.glBindBuffer(gl.GL_ELEMENT_ARRAY_BUFFER, self.m_ebo)
-        gl.glBufferData(gl.GL_ELEMENT_ARRAY_BUFFER, indices.itemsize * len(indices), indices, _drawType)
+        self.m_ebo = backend.glGenBuffers(1)
+        backend.glBindBuffer(gl.GL_ELEMENT_ARRAY_BUFFER, GLBackend.resolve(self.m_ebo))
+        backend.glBufferData(gl.GL_ELEMENT_ARRAY_BUFFER, indices.itemsize * len(indices), indices, _drawType)
         self.unbind()
 
     def setVertexAttrib(self, _id, _numValues, _type, _normalise, _size, _offset):
@@ -91,7 +153,8 @@ class VAO(object):
             _offset: The number of bytes to offset
         """
 
+        backend = GLBackend.current()
         self.bind()
-        gl.glVertexAttribPointer(_id, _numValues, _type, _normalise, _size, gl.ctypes.c_void_p(_offset))
-        gl.glEnableVertexAttribArray(_id)
+        backend.glVertexAttribPointer(_id, _numValues, _type, _normalise, _size, gl.ctypes.c_void_p(_offset))
+        backend.glEnableVertexAttribArray(_id)
         self.unbind()
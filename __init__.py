@@ -0,0 +1,31 @@
+import importlib
+import sys
+import types
+
+
+class LazyPackage(types.ModuleType):
+    """This class imports the submodules of the package when they are first accessed
+
+    Importing the package does not import OpenGL, glfw or pyrr, so scripts that only use Tools
+    do not pay for them, and Config.fastPath can still run before OpenGL.GL is imported.
+    """
+
+    # The submodules that can be accessed as attributes of the package
+    s_submodules = ['CommandRecorder', 'Config', 'GLBackend', 'ImportProfiler', 'LOD', 'Primitives', 'ShaderStore',
+                    'SkinnedMesh', 'StaticBatch', 'Tools', 'UniformBuffer', 'VAO', 'Window']
+
+    def __getattr__(self, _name):
+        if _name not in LazyPackage.s_submodules:
+            raise AttributeError(_name)
+
+        module = importlib.import_module('.' + _name, self.__name__)
+        setattr(self, _name, module)
+        return module
+
+
+# Replace this module with a lazy one that shares its attributes
+_package = LazyPackage(__name__, __doc__)
+_package.__dict__.update(sys.modules[__name__].__dict__)
+# Keep the original module alive, as Python 2 clears the globals of a module when it is freed
+_package._original = sys.modules[__name__]
+sys.modules[__name__] = _package